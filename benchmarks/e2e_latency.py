@@ -0,0 +1,292 @@
+"""
+End-to-end latency benchmark for locker open requests
+Drives LockerOpenRequestsHandler.handle_change with synthetic realtime payloads
+at a fixed arrival rate against the simulated locker bus and a local stand-in for
+the Supabase REST API, then reports per-stage latency percentiles and throughput
+
+Usage:
+    python -m benchmarks.e2e_latency --requests 500 --rate 50 --rtt 0.02 --json results.json
+"""
+import argparse
+import asyncio
+import functools
+import json
+import logging
+import math
+import sys
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+from src.handler.locker_open_requests_handler import LockerOpenRequestsHandler
+from src.locker.async_locker import AsyncLocker
+from src.locker.board_map import BoardMap
+from src.supa_db.async_supa_db import AsyncSupaDB
+
+DEFAULT_PORT = "sim://bench?latency=0.003&unlock_delay=0.01&auto_close=0.2&seed=1"
+STAGES = ('db_lookup', 'precheck', 'serial_unlock', 'verification', 'unlock_total',
+          'status_update', 'free_storage', 'total')
+
+
+class StandInRestAPI:
+    """
+    Minimal HTTP/1.1 server answering the PostgREST calls the service makes
+    Every response is delayed by rtt seconds to stand in for network and database time
+    """
+
+    def __init__(self, rtt: float = 0.02, role: str = 'user', paid: bool = True):
+        self.rtt = rtt
+        self.role = role
+        self.paid = paid
+        self.storages = {}
+        self.requests = {}
+        self.request_count = 0
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve, '127.0.0.1', 0)
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    def add_storage(self, storage_id: str, number: int):
+        self.storages[storage_id] = {'id': storage_id, 'number': number, 'laundry_id': f"laundry-{number}"}
+
+    def add_request(self, request_id: str, storage_id: str, user_id: str):
+        self.requests[request_id] = {'id': request_id, 'storage_id': storage_id,
+                                     'requested_by': user_id, 'status': 'pending'}
+
+    async def _serve(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b'\r\n\r\n')
+                lines = head.decode('latin-1').split('\r\n')
+                method, target, _ = lines[0].split(' ', 2)
+                headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+                length = int(headers.get('content-length') or headers.get('Content-Length') or 0)
+                body = json.loads(await reader.readexactly(length)) if length else None
+
+                await asyncio.sleep(self.rtt)
+                payload = json.dumps(self._handle(method, target, body)).encode()
+                writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n'
+                             b'Content-Length: ' + str(len(payload)).encode() + b'\r\n\r\n' + payload)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _handle(self, method: str, target: str, body):
+        self.request_count += 1
+        url = urlsplit(target)
+        table = url.path.rsplit('/', 1)[-1]
+        filters = {key: value.split('.', 1)[1] for key, value in parse_qsl(url.query)
+                   if key not in ('select', 'order', 'limit')}
+
+        if table == 'locker_open_requests':
+            request = self.requests.get(filters.get('id'))
+            if not request:
+                return []
+            if method == 'PATCH':
+                if filters.get('status', request['status']) != request['status']:
+                    return []
+                request.update(body)
+                return [request]
+            storage = self.storages.get(request['storage_id'])
+            return [{
+                'storage': storage and {**storage, 'laundry': {'paid': self.paid}},
+                'requester': {'role': self.role},
+            }]
+        if table == 'storages' and method == 'GET':
+            storage = self.storages.get(filters.get('id'))
+            return [storage] if storage else []
+        if table == 'profiles':
+            return [{'role': self.role}]
+        if table == 'laundry':
+            return [{'paid': self.paid}]
+        return [{}]
+
+
+class NullRealtimeService:
+    """Realtime stand-in; payloads are injected directly into the handler"""
+
+    def set_callback(self, callback):
+        pass
+
+    def add_connect_listener(self, callback):
+        pass
+
+
+class StageTimer:
+    """Collects latency samples per stage"""
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+
+    def record(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def wrap_async(self, obj, name: str, stage: str):
+        func = getattr(obj, name)
+
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        setattr(obj, name, timed)
+
+    def wrap_sync(self, obj, name: str, stage):
+        """stage may be a callable picking the stage from the call arguments"""
+        func = getattr(obj, name)
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage(*args, **kwargs) if callable(stage) else stage, time.perf_counter() - started)
+        setattr(obj, name, timed)
+
+    @staticmethod
+    def percentile(ordered: list, p: float) -> float:
+        """Nearest-rank percentile of an already sorted list"""
+        return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+    def summary(self) -> dict:
+        result = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            result[stage] = {
+                'count': len(ordered),
+                'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3),
+                'p50_ms': round(self.percentile(ordered, 50) * 1000, 3),
+                'p95_ms': round(self.percentile(ordered, 95) * 1000, 3),
+                'p99_ms': round(self.percentile(ordered, 99) * 1000, 3),
+                'max_ms': round(ordered[-1] * 1000, 3),
+            }
+        return result
+
+
+def instrument(timer: StageTimer, locker: AsyncLocker, supa_db: AsyncSupaDB):
+    timer.wrap_async(supa_db, 'get_open_request_context', 'db_lookup')
+    timer.wrap_async(supa_db, 'update_request_status', 'status_update')
+    timer.wrap_async(supa_db, 'free_storage', 'free_storage')
+    timer.wrap_async(locker, 'open', 'unlock_total')
+    for port_locker in locker.lockers.values():
+        # Bus-thread time only; queueing behind other commands shows up in unlock_total
+        timer.wrap_sync(port_locker, 'send_unlock', 'serial_unlock')
+        timer.wrap_sync(port_locker, 'is_locked',
+                        lambda number, use_cache=False: 'precheck' if use_cache else 'verification')
+
+
+async def run(args) -> dict:
+    api = StandInRestAPI(args.rtt, args.role)
+    await api.start()
+    board_map = BoardMap([(args.port, address) for address in range(args.boards)])
+    locker = AsyncLocker(args.port, board_map=board_map)
+    supa_db = await AsyncSupaDB.create(api.url, "bench.stand-in.jwt")
+    try:
+        handler = LockerOpenRequestsHandler(locker, supa_db, NullRealtimeService())
+        timer = StageTimer()
+        instrument(timer, locker, supa_db)
+
+        numbers = board_map.numbers()
+        for number in numbers:
+            api.add_storage(f"storage-{number}", number)
+
+        async def request(index: int):
+            number = numbers[index % len(numbers)]
+            request_id = f"request-{index}"
+            api.add_request(request_id, f"storage-{number}", f"user-{index}")
+            payload = {'data': {'record': {'id': request_id, 'storage_id': f"storage-{number}",
+                                           'requested_by': f"user-{index}"}}}
+            started = time.perf_counter()
+            await handler.handle_change(payload)
+            timer.record('total', time.perf_counter() - started)
+
+        # Open-loop arrivals: a slow stage must not slow down the offered load
+        tasks = []
+        started = time.perf_counter()
+        for index in range(args.requests):
+            delay = started + index / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(request(index)))
+        await asyncio.gather(*tasks)
+        duration = time.perf_counter() - started
+
+        outcomes = {}
+        for record in api.requests.values():
+            outcomes[record['status']] = outcomes.get(record['status'], 0) + 1
+        return {
+            'config': {'requests': args.requests, 'rate': args.rate, 'rtt': args.rtt,
+                       'port': args.port, 'boards': args.boards, 'role': args.role},
+            'duration_s': round(duration, 3),
+            'throughput_rps': round(args.requests / duration, 2),
+            'rest_calls': api.request_count,
+            'outcomes': outcomes,
+            'stages': timer.summary(),
+        }
+    finally:
+        locker.close()
+        await supa_db.close()
+        await api.close()
+
+
+def format_report(result: dict) -> str:
+    lines = [
+        f"{result['config']['requests']} requests at {result['config']['rate']}/s, "
+        f"REST RTT {result['config']['rtt'] * 1000:.0f} ms",
+        f"throughput {result['throughput_rps']} req/s over {result['duration_s']} s, "
+        f"{result['rest_calls']} REST calls, outcomes {result['outcomes']}",
+        f"{'stage':<14}{'count':>7}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)",
+    ]
+    for stage, stats in result['stages'].items():
+        lines.append(f"{stage:<14}{stats['count']:>7}{stats['mean_ms']:>10.2f}{stats['p50_ms']:>10.2f}"
+                     f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+    return '\n'.join(lines)
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description='Locker open request end-to-end latency benchmark')
+    parser.add_argument('--requests', type=int, default=200, help='Number of open requests to send')
+    parser.add_argument('--rate', type=float, default=20.0, help='Arrival rate in requests per second')
+    parser.add_argument('--rtt', type=float, default=0.02, help='Stand-in REST API response delay in seconds')
+    parser.add_argument('--port', default=DEFAULT_PORT, help='Locker port, normally a sim:// URL')
+    parser.add_argument('--boards', type=int, default=1, help='Number of boards on the port')
+    parser.add_argument('--role', default='user', help='Requester role returned by the stand-in API')
+    parser.add_argument('--json', dest='json_path', default=None,
+                        help='Write the results as JSON to this file ("-" for stdout)')
+    parser.add_argument('--log-level', default='WARNING',
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'])
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    logging.basicConfig(level=args.log_level)
+    result = asyncio.run(run(args))
+
+    if args.json_path == '-':
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        print(format_report(result))
+        if args.json_path:
+            with open(args.json_path, 'w') as f:
+                json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
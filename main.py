@@ -2,40 +2,90 @@ import asyncio
 import logging
 import os
 import argparse
+import signal
 import sys
 
 from setproctitle import setproctitle
 from dotenv import load_dotenv
 
+from src.handler.adaptive_poll import AdaptivePollInterval
 from src.handler.locker_moniter_handler import LockerMonitorHandler
 from src.handler.locker_open_requests_handler import LockerOpenRequestsHandler
-from src.locker.locker import Locker
-from src.supa_db.supa_db import SupaDB
+from src.locker.async_locker import AsyncLocker
+from src.locker.board_map import BoardMap
+from src.supa_db.async_supa_db import AsyncSupaDB
 from src.supa_realtime.realtime_service import RealtimeService
-from src.utils.logger import setup_logger
+from src.utils.logger import SUBSYSTEMS, parse_subsystem_levels, setup_logger
+from src.utils.metrics import MetricsServer
 
 SERVICE_NAME = "locker-service"
+DEFAULT_PORT = "/dev/ttyUSB0"
 
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Locker Service')
     # parser.add_argument('--port', default='COM6', help='Serial port for locker connection')
-    parser.add_argument('--port', default='/dev/ttyUSB0', help='Serial port for locker connection')
+    parser.add_argument('--port', default=None,
+                        help='Serial port(s) for locker connection, comma-separated (e.g. /dev/ttyUSB0,/dev/ttyUSB1) '
+                             f'(default: {DEFAULT_PORT}, or the ports of --board-map)')
+    parser.add_argument('--board-map',
+                        default=None,
+                        help='Board addresses per port, e.g. "/dev/ttyUSB0=0,1;/dev/ttyUSB1=0" '
+                             '(default: one board at address 0 on each --port)')
+    parser.add_argument('--poll-min', type=float, default=0.1,
+                        help='Fastest status poll interval in seconds, used after a state change or unlock')
+    parser.add_argument('--poll-max', type=float, default=5.0,
+                        help='Slowest status poll interval in seconds when idle')
+    parser.add_argument('--poll-decay', type=float, default=2.0,
+                        help='Factor the poll interval grows by per idle poll')
+    parser.add_argument('--poll-fast-window', type=float, default=10.0,
+                        help='Seconds to keep fast polling after a state change or unlock')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='Serve Prometheus metrics at http://<metrics-host>:<port>/metrics (disabled by default)')
+    parser.add_argument('--metrics-host', default='127.0.0.1',
+                        help='Address the metrics endpoint binds to')
     parser.add_argument('--log-level',
                         default='INFO',
                         choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
                         help='Set the logging level')
+    parser.add_argument('--subsystem-log-level',
+                        type=parse_subsystem_levels,
+                        default={},
+                        help=f'Per-subsystem logging levels, e.g. "locker=WARNING,supa_realtime=DEBUG" '
+                             f'(subsystems: {", ".join(SUBSYSTEMS)})')
     parser.add_argument('--log-dir',
                         default='logs',
                         help='Directory for log files')
     return parser.parse_args()
 
 
+def resolve_board_map(port: str, board_map_spec: str) -> BoardMap:
+    """
+    Board map from --port and --board-map
+    --board-map defines the ports; a --port given alongside it must name the same ports
+    """
+    ports = [p.strip() for p in (port or DEFAULT_PORT).split(',') if p.strip()]
+    if not board_map_spec:
+        return BoardMap([(p, 0) for p in ports])
+
+    board_map = BoardMap.parse(board_map_spec)
+    if port is not None and set(ports) != set(board_map.ports()):
+        raise Exception(f"--port {port} does not match the ports of --board-map ({', '.join(board_map.ports())})")
+    logging.info("Using ports from --board-map: %s", ', '.join(board_map.ports()))
+    return board_map
+
+
 async def main():
     try:
         args = parse_arguments()
 
-        setup_logger(args.log_dir, logging.getLevelName(args.log_level))
+        setup_logger(args.log_dir, logging.getLevelName(args.log_level),
+                     subsystem_levels=args.subsystem_log_level)
+        try:
+            # systemd stops the service with SIGTERM; cancel instead so cleanup and the log drain run
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except NotImplementedError:
+            pass
         setproctitle(SERVICE_NAME)
         load_dotenv()
 
@@ -45,15 +95,22 @@ async def main():
         if not all([database_url, jwt]):
             raise Exception("Required environment variables are missing")
 
-        logging.info(f"Starting {SERVICE_NAME} with port {args.port}")
+        board_map = resolve_board_map(args.port, args.board_map)
+        logging.info("Starting %s with ports %s", SERVICE_NAME, ', '.join(board_map.ports()))
+
+        if args.metrics_port is not None:
+            metrics_server = MetricsServer(args.metrics_port, args.metrics_host)
+            await metrics_server.start()
 
-        locker = Locker(args.port)
-        supa_db = SupaDB(database_url, jwt)
+        locker = AsyncLocker(board_map.ports(), board_map=board_map)
+        supa_db = await AsyncSupaDB.create(database_url, jwt)
         realtime_service = RealtimeService(database_url, jwt)
+        supa_db.register_cache_invalidation(realtime_service)
 
         handlers = [
             LockerOpenRequestsHandler(locker, supa_db, realtime_service).start(),
-            LockerMonitorHandler(locker, supa_db).start(),
+            LockerMonitorHandler(locker, supa_db, AdaptivePollInterval(
+                args.poll_min, args.poll_max, args.poll_decay, args.poll_fast_window), realtime_service).start(),
         ]
 
         await asyncio.gather(*handlers)
@@ -61,11 +118,15 @@ async def main():
     except (KeyboardInterrupt, asyncio.CancelledError):
         logging.info("Service shutting down gracefully...")
     except Exception as e:
-        logging.critical(f"Service error: {str(e)}")
+        logging.critical("Service error: %s", e)
         sys.exit(1)
     finally:
         if 'locker' in locals():
             locker.close()
+        if 'supa_db' in locals():
+            await supa_db.close()
+        if 'metrics_server' in locals():
+            await metrics_server.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,48 @@
+import asyncio
+import time
+
+
+class AdaptivePollInterval:
+    """
+    Poll interval for the locker monitor
+    Polls at min_interval for fast_window seconds after any activity (state
+    change or unlock), then backs off by a factor of decay per idle poll up to
+    max_interval
+    """
+
+    def __init__(self, min_interval: float = 0.1, max_interval: float = 5.0,
+                 decay: float = 2.0, fast_window: float = 10.0):
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Poll intervals must satisfy 0 < min_interval <= max_interval")
+        if decay < 1:
+            raise ValueError("Poll decay must be at least 1")
+
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.decay = decay
+        self.fast_window = fast_window
+        self._interval = min_interval
+        self._fast_until = 0.0
+        self._wake = asyncio.Event()
+
+    def notify_activity(self):
+        """Switch to the fast rate and cut the current sleep short"""
+        self._fast_until = time.monotonic() + self.fast_window
+        self._interval = self.min_interval
+        self._wake.set()
+
+    def next_interval(self) -> float:
+        if time.monotonic() < self._fast_until:
+            return self.min_interval
+        interval = self._interval
+        self._interval = min(self._interval * self.decay, self.max_interval)
+        return interval
+
+    async def sleep(self):
+        interval = self.next_interval()
+        try:
+            await asyncio.wait_for(self._wake.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._wake.clear()
@@ -2,46 +2,174 @@ import asyncio
 import logging
 import time
 
+from src.locker.locker_states import LockerStates
+from src.utils.metrics import Gauge, Histogram
+from .adaptive_poll import AdaptivePollInterval
+from .storage_state import StorageState
+
+logger = logging.getLogger('handler')
+
+POLL_CYCLE_SECONDS = Histogram('monitor_poll_cycle_seconds', 'Time to read all locker states and record the changes')
+UNKNOWN_LOCKERS = Gauge('monitor_unknown_lockers', 'Monitored lockers whose state could not be read')
 
 class LockerMonitorHandler:
-    def __init__(self, locker, supa_db):
+    STATE_EVENT = "storage_state"
+
+    def __init__(self, locker, supa_db, poll_interval: AdaptivePollInterval = None, realtime_service=None):
         self.locker = locker
         self.supa_db = supa_db
+        self.realtime_service = realtime_service
         self.storage_states = {}
+        self.storages_by_number = {}
+        # Recorded lock state of every monitored locker number, diffed against each poll
+        self.known_states = LockerStates()
+        self.tracked_mask = 0
+        self.unknown_mask = 0
         self.last_full_sync = 0
-        self.FULL_SYNC_INTERVAL = 60
-        logging.info("Locker monitoring system initialized")
+        self.last_incremental_sync = 0
+        self.sync_watermark = None
+        self.INCREMENTAL_SYNC_INTERVAL = 60
+        self.FULL_SYNC_INTERVAL = 3600
+        self.poll_interval = poll_interval or AdaptivePollInterval()
+        self.locker.add_unlock_listener(self.poll_interval.notify_activity)
+        logger.info("Locker monitoring system initialized")
+
+    def track(self, storage_id: str, number: int) -> StorageState:
+        state = StorageState(storage_id, number)
+        self.storage_states[storage_id] = state
+        self.storages_by_number.setdefault(number, []).append(state)
+        self.tracked_mask |= LockerStates.bit(number)
+        return state
 
-    async def sync_storage_states(self, storages, locker_states):
+    def untrack(self, storage_id: str):
+        state = self.storage_states.pop(storage_id, None)
+        if not state:
+            return
+        same_number = self.storages_by_number.get(state.number, [])
+        same_number.remove(state)
+        if not same_number:
+            del self.storages_by_number[state.number]
+            self.known_states.discard(state.number)
+            self.tracked_mask &= ~LockerStates.bit(state.number)
+
+    def record_state(self, state: StorageState, is_locked: bool, changes: list):
+        previous = state.is_locked
+        state.is_locked = is_locked
+        self.known_states.set(state.number, is_locked)
+        self.supa_db.queue_storage_status(state.id, is_locked)
+        if previous is not None:
+            self.poll_interval.notify_activity()
+            changes.append({
+                'storage_id': state.id,
+                'is_locked': is_locked,
+                'timestamp': int(time.time() * 1000)
+            })
+        logger.debug("Storage %s state changed: %s", state.number, 'Locked' if is_locked else 'Unlocked')
+
+    async def sync_storage_states(self, storages, locker_states: LockerStates):
+        """
+        Compare the given storages one by one against a reading, tracking any new ones
+        Storages whose locker state is unknown keep their last recorded state;
+        rows without a valid locker number are skipped
+        """
         try:
+            changes = []
             for storage in storages:
-                current_state = locker_states.get(storage['number'], True)
-                stored_state = self.storage_states.get(storage['id'])
-
-                if not stored_state or stored_state['is_locked'] != current_state:
-                    self.storage_states[storage['id']] = {
-                        'number': storage['number'],
-                        'is_locked': current_state
-                    }
-                    self.supa_db.update_storage_status(storage['id'], current_state)
-                    logging.debug(
-                        f"Storage {storage['number']} state changed: {'Locked' if current_state else 'Unlocked'}")
+                number = storage.get('number')
+                if isinstance(number, bool) or not isinstance(number, int) or number < 1:
+                    logger.warning("Storage %s has invalid locker number %r, not monitored", storage.get('id'), number)
+                    self.untrack(storage.get('id'))
+                    continue
+
+                current_state = locker_states.get(storage['number'])
+                state = self.storage_states.get(storage['id'])
+                if state and state.number != storage['number']:
+                    self.untrack(storage['id'])
+                    state = None
+                if not state:
+                    state = self.track(storage['id'], storage['number'])
+
+                if current_state is not None and state.is_locked != current_state:
+                    self.record_state(state, current_state, changes)
+
+            if changes:
+                await self.publish_changes(changes)
             return True
         except Exception as e:
-            logging.error(f"Storage sync failed: {str(e)}")
+            logger.error("Storage sync failed: %s", e)
             return False
 
+    async def apply_locker_states(self, locker_states: LockerStates):
+        """
+        Record a poll reading; only lockers whose bit flipped cost any work
+        Unknown lockers hold their last recorded state, so a failed board read
+        causes no writes; tracked lockers read for the first time are recorded
+        """
+        try:
+            self.report_unknown(self.tracked_mask & ~locker_states.mask)
+            first_read = locker_states.mask & self.tracked_mask & ~self.known_states.mask
+            changed = locker_states.changed(self.known_states) | first_read
+            if not changed:
+                return
+
+            changes = []
+            for number in LockerStates.numbers(changed):
+                is_locked = locker_states[number]
+                for state in self.storages_by_number[number]:
+                    self.record_state(state, is_locked, changes)
+            if changes:
+                await self.publish_changes(changes)
+        except Exception as e:
+            logger.error("Storage sync failed: %s", e)
+
+    def report_unknown(self, unknown: int):
+        """Log lockers whose state became unknown or readable again, once per transition"""
+        if unknown == self.unknown_mask:
+            return
+        UNKNOWN_LOCKERS.set(bin(unknown).count('1'))
+        lost = unknown & ~self.unknown_mask
+        recovered = self.unknown_mask & ~unknown
+        if lost:
+            logger.warning("Lock state unknown for lockers %s, holding last known state",
+                           list(LockerStates.numbers(lost)))
+        if recovered:
+            logger.info("Lock state readable again for lockers %s", list(LockerStates.numbers(recovered)))
+        self.unknown_mask = unknown
+
+    async def publish_changes(self, changes):
+        """Push state deltas to clients ahead of the batched DB write"""
+        if not self.realtime_service:
+            return
+        if await self.realtime_service.broadcast(self.STATE_EVENT, {'changes': changes}):
+            logger.debug("Broadcast %s storage state changes", len(changes))
+
+    def advance_watermark(self, storages):
+        timestamps = [storage['updated_at'] for storage in storages if storage.get('updated_at')]
+        if self.sync_watermark:
+            timestamps.append(self.sync_watermark)
+        # ISO timestamps from PostgREST share one format, so they order as strings
+        self.sync_watermark = max(timestamps, default=None)
+
+    async def fetch_all_storages(self):
+        """All storages with the columns the monitor needs; resets the sync watermark"""
+        self.sync_watermark = None
+        storages = await self.supa_db.get_storages_changed_since(None)
+        if storages is None:
+            return await self.supa_db.get_all_storages('id, number')
+        self.advance_watermark(storages)
+        return storages
+
     async def initialize_states(self):
         try:
-            storages = self.supa_db.get_all_storages()
+            storages = await self.fetch_all_storages()
             if not storages:
-                logging.warning("Storage initialization failed: No storage units found")
+                logger.warning("Storage initialization failed: No storage units found")
                 return False
 
-            locker_states = self.locker.get_all_locker_states()
+            locker_states = await self.locker.get_all_locker_states()
             if await self.sync_storage_states(storages, locker_states):
-                self.last_full_sync = time.time()
-                logging.info("All storage units initialized successfully")
+                self.last_full_sync = self.last_incremental_sync = time.time()
+                logger.info("All storage units initialized successfully")
                 return True
             return False
         except Exception as e:
@@ -49,44 +177,89 @@ class LockerMonitorHandler:
 
     async def full_sync(self):
         try:
-            logging.debug("Starting full system synchronization")
-            storages = self.supa_db.get_all_storages()
+            logger.debug("Starting full system synchronization")
+            storages = await self.fetch_all_storages()
             if not storages:
-                logging.warning("Full sync failed: No storage units found")
+                logger.warning("Full sync failed: No storage units found")
                 return
 
-            locker_states = self.locker.get_all_locker_states()
+            locker_states = await self.locker.get_all_locker_states()
             current_ids = {storage['id'] for storage in storages}
             removed_ids = set(self.storage_states.keys()) - current_ids
 
             for storage_id in removed_ids:
-                del self.storage_states[storage_id]
-                logging.debug(f"Storage unit {storage_id} removed from monitoring")
+                self.untrack(storage_id)
+                logger.debug("Storage unit %s removed from monitoring", storage_id)
 
             if await self.sync_storage_states(storages, locker_states):
-                self.last_full_sync = time.time()
-                logging.debug("Full synchronization completed")
+                self.last_full_sync = self.last_incremental_sync = time.time()
+                logger.debug("Full synchronization completed")
+
+        except Exception as e:
+            logger.error("Full sync operation failed: %s", e)
+
+    async def incremental_sync(self):
+        """
+        Pick up storages added or renumbered since the last sync watermark
+        Removed storages are only dropped by the periodic full sync
+        """
+        if not self.sync_watermark:
+            # Incremental sync not available, reconcile everything instead
+            await self.full_sync()
+            return
+
+        # Failures are retried from the same watermark on the next interval
+        self.last_incremental_sync = time.time()
+        try:
+            changed = await self.supa_db.get_storages_changed_since(self.sync_watermark)
+            if changed is None:
+                return
+
+            new_storages = []
+            for storage in changed:
+                state = self.storage_states.get(storage['id'])
+                if state and state.number == storage['number']:
+                    continue
+                # New or renumbered: treat like a fresh storage so its status is written again
+                self.untrack(storage['id'])
+                new_storages.append(storage)
+
+            if new_storages:
+                locker_states = await self.locker.get_all_locker_states()
+                if not await self.sync_storage_states(new_storages, locker_states):
+                    return
+                logger.debug("Incremental sync picked up %s storage units", len(new_storages))
+
+            self.advance_watermark(changed)
 
         except Exception as e:
-            logging.error(f"Full sync operation failed: {str(e)}")
+            logger.error("Incremental sync operation failed: %s", e)
 
     async def start(self):
+        batcher_task = asyncio.create_task(self.supa_db.status_batcher.run())
+        try:
+            await self.monitor()
+        finally:
+            self.supa_db.status_batcher.stop()
+            await batcher_task
+
+    async def monitor(self):
         if not await self.initialize_states():
             raise Exception("System monitor initialization failed - shutting down")
 
-        logging.info("Locker monitoring system started")
+        logger.info("Locker monitoring system started")
         while True:
             try:
                 current_time = time.time()
                 if current_time - self.last_full_sync >= self.FULL_SYNC_INTERVAL:
                     await self.full_sync()
+                elif current_time - self.last_incremental_sync >= self.INCREMENTAL_SYNC_INTERVAL:
+                    await self.incremental_sync()
 
-                locker_states = self.locker.get_all_locker_states()
-                await self.sync_storage_states(
-                    [{'id': id, 'number': info['number']} for id, info in self.storage_states.items()],
-                    locker_states
-                )
+                started = time.perf_counter()
+                await self.apply_locker_states(await self.locker.get_all_locker_states())
+                POLL_CYCLE_SECONDS.observe(time.perf_counter() - started)
 
-                await asyncio.sleep(1)
+                await self.poll_interval.sleep()
             except Exception as e:
                 raise Exception(f"Critical monitoring system error: {str(e)}")
@@ -1,95 +1,202 @@
+import asyncio
 import logging
+from datetime import datetime, timedelta, timezone
+
+from src.utils.metrics import Counter
+from .request_dedup import RequestDedupIndex
+from .request_dispatcher import RequestDispatcher
+
+logger = logging.getLogger('handler')
+
+OPEN_REQUESTS = Counter('open_requests_total', 'Open requests moved to a final status', ['status'])
 
 
 class LockerOpenRequestsHandler:
-    def __init__(self, locker, supa_db, realtime_service):
+    CATCH_UP_MAX_AGE = 600  # seconds; older pending requests are not replayed on startup
+    CATCH_UP_RETRY_DELAY = 5  # seconds
+    DEDUP_WINDOW = 600  # seconds
+
+    def __init__(self, locker, supa_db, realtime_service, max_workers: int = 8, max_pending: int = 256):
         self.locker = locker
         self.supa_db = supa_db
         self.realtime_service = realtime_service
-        self.realtime_service.set_callback(self.handle_change)
-        logging.info("LockerOpenRequestsHandler initialized successfully")
+        self.dispatcher = RequestDispatcher(self.handle_change, max_workers, max_pending)
+        self._seen_requests = RequestDedupIndex(self.DEDUP_WINDOW)
+        self._catch_up_from = None
+        self._catch_up_lock = asyncio.Lock()
+        self._catch_up_task = None
+        self.realtime_service.set_callback(self.dispatch)
+        self.realtime_service.add_connect_listener(self.catch_up)
+        logger.info("LockerOpenRequestsHandler initialized successfully")
+
+    @staticmethod
+    def _parse_timestamp(value):
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return None
+
+    def _accept(self, record, queued: bool):
+        """Record the outcome of a dispatch attempt for dedup and the catch-up cursor"""
+        if queued:
+            self._seen_requests.claim(record['id'])
+            return
+
+        # Make sure the next catch-up reaches back to this request
+        created_at = self._parse_timestamp(record.get('created_at'))
+        if created_at and self._catch_up_from and created_at < self._catch_up_from:
+            self._catch_up_from = created_at
+        if self.dispatcher.accepting:
+            self._schedule_catch_up()
+
+    def dispatch(self, payload) -> bool:
+        """Queue a request; requests for the same storage are handled in order"""
+        try:
+            record = payload['data']['record']
+        except (KeyError, TypeError):
+            logger.error("Malformed locker open request payload: %s", payload)
+            return False
+
+        if record.get('id') in self._seen_requests:
+            logger.debug("Duplicate request ignored: %s", record.get('id'))
+            return False
+
+        queued = self.dispatcher.submit_nowait(record.get('storage_id'), payload)
+        self._accept(record, queued)
+        if not queued:
+            logger.warning("Request dispatcher full, request %s left pending", record.get('id'))
+        return queued
+
+    async def catch_up(self):
+        """
+        Queue requests that are still pending but were never delivered live,
+        e.g. inserted during a reconnect gap or while the service was down
+        Only catch-up moves the cursor, and only over requests it has seen in
+        order; a live event may arrive before the catch-up after a reconnect
+        and must not push the cursor past requests inserted during the gap
+        Requests older than CATCH_UP_MAX_AGE are never replayed
+        """
+        async with self._catch_up_lock:
+            # Never reach back further than CATCH_UP_MAX_AGE, however old the cursor is
+            floor = datetime.now(timezone.utc) - timedelta(seconds=self.CATCH_UP_MAX_AGE)
+            since = max(self._catch_up_from or floor, floor)
+            requests = await self.supa_db.get_pending_requests(since.isoformat())
+
+            queued = 0
+            contiguous = True
+            for record in requests:
+                if record['id'] not in self._seen_requests:
+                    accepted = await self.dispatcher.submit(record['storage_id'], {'data': {'record': record}})
+                    self._accept(record, accepted)
+                    queued += accepted
+                    contiguous = contiguous and accepted
+                created_at = self._parse_timestamp(record.get('created_at'))
+                if contiguous and created_at and (not self._catch_up_from or created_at > self._catch_up_from):
+                    self._catch_up_from = created_at
+            if queued:
+                logger.info("Caught up on %s pending requests", queued)
+
+    def _schedule_catch_up(self):
+        if self._catch_up_task and not self._catch_up_task.done():
+            return
+
+        async def delayed_catch_up():
+            await asyncio.sleep(self.CATCH_UP_RETRY_DELAY)
+            await self.catch_up()
+
+        self._catch_up_task = asyncio.create_task(delayed_catch_up())
 
     async def handle_change(self, payload):
         try:
-            logging.debug(f"New locker open request received: {payload}")
+            logger.debug("New locker open request received: %s", payload)
             record = payload['data']['record']
             request_id = record['id']
             storage_id = record['storage_id']
             requested_by = record['requested_by']
 
-            storage = self.supa_db.get_storage_info(storage_id)
-            if not storage:
-                logging.error(f"Storage unit not found in database: {storage_id}")
+            context = await self.supa_db.get_open_request_context(request_id, storage_id, requested_by)
+            if not context:
+                logger.error("Storage unit not found in database: %s", storage_id)
                 await self.update_request_status(request_id, 'failed')
                 return
 
-            user_role = self.supa_db.get_user_role(requested_by)
+            user_role = context['role']
             if not user_role:
-                logging.error(f"User role not found for user: {requested_by}")
+                logger.error("User role not found for user: %s", requested_by)
                 await self.update_request_status(request_id, 'failed')
                 return
 
-            if user_role in ['deliver', 'manager']:
-                logging.debug(f"Processing {user_role} request for storage unit {storage_id}")
-                if await self.open_locker(storage['number']):
-                    await self.update_request_status(request_id, 'success')
-                    await self.free_storage(storage_id)
+            if user_role in self.supa_db.PRIVILEGED_ROLES:
+                logger.debug("Processing %s request for storage unit %s", user_role, storage_id)
+                if await self.open_locker(context['number']):
+                    if await self.update_request_status(request_id, 'success'):
+                        await self.free_storage(storage_id)
                     return
                 await self.update_request_status(request_id, 'failed')
                 return
 
-            if not storage['laundry_id']:
-                logging.error(f"No laundry associated with storage unit: {storage_id}")
+            if not context['laundry_id']:
+                logger.error("No laundry associated with storage unit: %s", storage_id)
                 await self.update_request_status(request_id, 'failed')
                 return
 
-            laundry = self.supa_db.get_laundry_info(storage['laundry_id'])
-            if not laundry or not laundry['paid']:
-                logging.debug(f"Payment required for laundry: {storage['laundry_id']}")
+            if not context['paid']:
+                logger.debug("Payment required for laundry: %s", context['laundry_id'])
                 await self.update_request_status(request_id, 'reject')
                 return
 
-            logging.debug(f"Processing paid user request for storage unit {storage_id}")
-            if await self.open_locker(storage['number']):
-                await self.update_request_status(request_id, 'success')
-                await self.free_storage(storage_id)
+            logger.debug("Processing paid user request for storage unit %s", storage_id)
+            if await self.open_locker(context['number']):
+                if await self.update_request_status(request_id, 'success'):
+                    await self.free_storage(storage_id)
                 return
             await self.update_request_status(request_id, 'failed')
 
         except Exception as e:
-            logging.error(f"Request processing failed: {str(e)}")
+            logger.error("Request processing failed: %s", e)
             await self.update_request_status(request_id, 'failed')
 
     async def free_storage(self, storage_id: str):
         try:
-            self.supa_db.free_storage(storage_id)
-            logging.debug(f"Storage unit freed successfully: {storage_id}")
+            await self.supa_db.free_storage(storage_id)
+            logger.debug("Storage unit freed successfully: %s", storage_id)
         except Exception as e:
-            logging.error(f"Failed to free storage unit {storage_id}: {str(e)}")
+            logger.error("Failed to free storage unit %s: %s", storage_id, e)
 
     async def open_locker(self, number: int) -> bool:
         try:
-            result = self.locker.open(number)
+            result = await self.locker.open(number)
             if result:
-                logging.debug(f"Locker {number} opened successfully")
+                logger.debug("Locker %s opened successfully", number)
             else:
-                logging.debug(f"Failed to open locker {number}")
+                logger.debug("Failed to open locker %s", number)
             return result
         except Exception as e:
-            logging.error(f"Error occurred while opening locker {number}: {str(e)}")
+            logger.error("Error occurred while opening locker %s: %s", number, e)
             return False
 
-    async def update_request_status(self, request_id: str, status: str):
+    async def update_request_status(self, request_id: str, status: str) -> bool:
+        """Move a pending request to its final status; returns False if it was already final"""
         try:
-            self.supa_db.update_request_status(request_id, status)
-            logging.debug(f"Request {request_id} status updated to: {status}")
+            if await self.supa_db.update_request_status(request_id, status):
+                OPEN_REQUESTS.labels(status).inc()
+                logger.debug("Request %s status updated to: %s", request_id, status)
+                return True
+            logger.debug("Request %s already finalized, status %s not applied", request_id, status)
+            return False
         except Exception as e:
-            logging.error(f"Failed to update status for request {request_id}: {str(e)}")
+            logger.error("Failed to update status for request %s: %s", request_id, e)
+            return False
 
     async def start(self):
-        logging.info("Starting LockerOpenRequestsHandler")
+        logger.info("Starting LockerOpenRequestsHandler")
+        self.dispatcher.start()
         try:
             await self.realtime_service.start_listening()
         except Exception as e:
             raise Exception(f"Failed to start LockerOpenRequestsHandler: {str(e)}")
+        finally:
+            if self._catch_up_task:
+                self._catch_up_task.cancel()
+            await self.dispatcher.close()
 
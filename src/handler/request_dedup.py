@@ -0,0 +1,25 @@
+from src.supa_db.ttl_cache import TTLCache
+
+
+class RequestDedupIndex:
+    """
+    Remembers recently accepted request ids for a bounded time window
+    so duplicate deliveries (reconnect replays, catch-up overlap, double taps)
+    are dropped before they reach the locker or the database
+    """
+
+    def __init__(self, window: float = 600.0, max_size: int = 4096):
+        self._ids = TTLCache(max_size, window)
+
+    def __contains__(self, request_id) -> bool:
+        return self._ids.get(request_id) is not TTLCache.MISSING
+
+    def claim(self, request_id) -> bool:
+        """Mark a request as accepted; returns False if it already was within the window"""
+        if request_id in self:
+            return False
+        self._ids.set(request_id, True)
+        return True
+
+    def __len__(self):
+        return len(self._ids)
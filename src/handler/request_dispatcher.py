@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from collections import deque
+
+from src.utils.metrics import Counter, Gauge, Histogram
+
+logger = logging.getLogger('handler')
+
+OPEN_REQUESTS_PENDING = Gauge('open_requests_pending', 'Open requests queued and waiting for a worker')
+OPEN_REQUESTS_IN_FLIGHT = Gauge('open_requests_in_flight', 'Open requests being handled right now')
+OPEN_REQUESTS_REJECTED = Counter('open_requests_rejected_total', 'Open requests refused because the queue was full')
+OPEN_REQUEST_SECONDS = Histogram('open_request_handling_seconds', 'Time to handle one open request')
+
+
+class RequestDispatcher:
+    """
+    Bounded worker pool for open requests
+    Items with the same key (storage id) run strictly in arrival order while
+    different keys run in parallel on up to max_workers workers; at most
+    max_pending items wait at once
+    """
+
+    def __init__(self, handler, max_workers: int = 8, max_pending: int = 256):
+        self.handler = handler
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._queues = {}
+        self._ready = asyncio.Queue()
+        self._workers = []
+        self._pending = 0
+        self._in_flight = 0
+        self._accepting = False
+        self._changed = asyncio.Condition()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def accepting(self) -> bool:
+        return self._accepting
+
+    def start(self):
+        OPEN_REQUESTS_PENDING.set_function(lambda: self._pending)
+        OPEN_REQUESTS_IN_FLIGHT.set_function(lambda: self._in_flight)
+        self._accepting = True
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+        logger.debug("Request dispatcher started with %s workers", self.max_workers)
+
+    def submit_nowait(self, key, item) -> bool:
+        """Queue an item; returns False if the dispatcher is full or closed"""
+        if not self._accepting:
+            return False
+        if self._pending >= self.max_pending:
+            OPEN_REQUESTS_REJECTED.inc()
+            return False
+
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = deque()
+            # A key is handed to a worker only once; the worker re-queues it while items remain
+            self._ready.put_nowait(key)
+        queue.append(item)
+        self._pending += 1
+        return True
+
+    async def submit(self, key, item) -> bool:
+        """Queue an item, waiting for room; returns False if the dispatcher is closed"""
+        async with self._changed:
+            await self._changed.wait_for(lambda: not self._accepting or self._pending < self.max_pending)
+            return self.submit_nowait(key, item)
+
+    async def _notify(self):
+        async with self._changed:
+            self._changed.notify_all()
+
+    async def _worker(self):
+        while True:
+            key = await self._ready.get()
+            queue = self._queues[key]
+            item = queue.popleft()
+            self._pending -= 1
+            self._in_flight += 1
+            started = time.perf_counter()
+            try:
+                await self.handler(item)
+            except Exception as e:
+                logger.error("Request handler failed for %s: %s", key, e)
+            finally:
+                OPEN_REQUEST_SECONDS.observe(time.perf_counter() - started)
+                self._in_flight -= 1
+                if queue:
+                    self._ready.put_nowait(key)
+                else:
+                    del self._queues[key]
+                await self._notify()
+
+    async def close(self, timeout: float = 30.0):
+        """Stop accepting items, let queued and running items finish, then stop the workers"""
+        self._accepting = False
+        await self._notify()
+        try:
+            async with self._changed:
+                await asyncio.wait_for(
+                    self._changed.wait_for(lambda: not self._pending and not self._in_flight), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Request dispatcher closed with %s unfinished requests", self._pending + self._in_flight)
+
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.debug("Request dispatcher stopped")
@@ -0,0 +1,11 @@
+class StorageState:
+    """Last recorded lock state of one monitored storage"""
+    __slots__ = ('id', 'number', 'is_locked')
+
+    def __init__(self, storage_id: str, number: int, is_locked: bool = None):
+        self.id = storage_id
+        self.number = number
+        self.is_locked = is_locked
+
+    def __repr__(self):
+        return f"StorageState({self.id!r}, {self.number}, {self.is_locked})"
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+
+from .board_map import BoardMap
+from .bus_scheduler import BusScheduler
+from .constants import BusPriority
+from .locker import Locker
+from .locker_states import LockerStates
+
+logger = logging.getLogger('locker')
+
+
+class AsyncLocker:
+    """
+    Awaitable front end for every locker bus of the service
+    Each serial port gets its own Locker and BusScheduler (I/O thread), so a slow
+    or timed-out board read never blocks the event loop, unlock commands are
+    served ahead of routine status polls and ports are driven in parallel
+    """
+
+    def __init__(self, ports, state_max_age: float = Locker.STATE_MAX_AGE, board_map: BoardMap = None):
+        if isinstance(ports, str):
+            ports = [port.strip() for port in ports.split(',') if port.strip()]
+        self.board_map = board_map or BoardMap([(port, 0) for port in ports])
+        self.lockers = {}
+        self.buses = {}
+        self._unlock_listeners = []
+
+        try:
+            for port in self.board_map.ports():
+                self.lockers[port] = Locker(port, state_max_age, self.board_map)
+                self.buses[port] = BusScheduler(self.lockers[port], name=f"locker-bus:{port}")
+        except Exception:
+            self.close()
+            raise
+        logger.info("AsyncLocker started for ports %s (%s lockers)", list(self.lockers), len(self.board_map))
+
+    def add_unlock_listener(self, callback):
+        """Register a callable invoked after every open, so pollers can expect door activity"""
+        self._unlock_listeners.append(callback)
+
+    def _notify_unlock(self):
+        for callback in self._unlock_listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error("Unlock listener failed: %s", e)
+
+    def _port_of(self, locker_number: int):
+        slot = self.board_map.locate(locker_number)
+        if not slot:
+            logger.error("Invalid locker number: %s (not in board map)", locker_number)
+            return None
+        return slot.port
+
+    async def get_all_locker_states(self, priority: int = BusPriority.POLL) -> LockerStates:
+        results = await asyncio.gather(*(
+            self.buses[port].submit(priority, locker.get_all_locker_states)
+            for port, locker in self.lockers.items()
+        ))
+        states = LockerStates()
+        for port_states in results:
+            states.update(port_states)
+        return states
+
+    async def is_locked(self, locker_number: int, priority: int = BusPriority.POLL,
+                        use_cache: bool = False) -> bool:
+        port = self._port_of(locker_number)
+        if port is None:
+            return True
+        return await self.buses[port].submit(priority, self.lockers[port].is_locked, locker_number, use_cache)
+
+    async def open(self, locker_number: int) -> bool:
+        port = self._port_of(locker_number)
+        if port is None:
+            return False
+        success = await self.buses[port].submit(BusPriority.UNLOCK, self.lockers[port].open, locker_number)
+        self._notify_unlock()
+        return success
+
+    async def open_many(self, locker_numbers) -> dict:
+        """
+        Run Locker.open_many for each port's lockers, all ports in parallel
+        Returns a dictionary with locker numbers as keys and unlock success as values
+        """
+        results = {number: False for number in locker_numbers}
+        by_port = {}
+        for number in results:
+            port = self._port_of(number)
+            if port is not None:
+                by_port.setdefault(port, []).append(number)
+
+        for port_results in await asyncio.gather(*(
+                self.buses[port].submit(BusPriority.UNLOCK, self.lockers[port].open_many, numbers)
+                for port, numbers in by_port.items())):
+            results.update(port_results)
+        if by_port:
+            self._notify_unlock()
+        return results
+
+    async def open_all(self) -> bool:
+        results = await self.open_many(self.board_map.numbers())
+        return all(results.values())
+
+    def close(self):
+        for bus in self.buses.values():
+            bus.close()
+        for locker in self.lockers.values():
+            locker.close()
+        logger.debug("AsyncLocker bus schedulers stopped")
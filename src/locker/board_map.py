@@ -0,0 +1,78 @@
+from collections import namedtuple
+
+from .constants import PacketByte
+
+BoardSlot = namedtuple('BoardSlot', ['port', 'address', 'channel'])
+Board = namedtuple('Board', ['port', 'address', 'first_number'])
+
+
+class BoardMap:
+    """
+    Maps global locker numbers to (port, board address, channel)
+    Lockers are numbered from 1 consecutively across boards in configuration
+    order, CHANNELS_PER_BOARD lockers per board
+    """
+    CHANNELS_PER_BOARD = 16
+    MAX_ADDRESS = 0x0F
+    ADDRESS_SHIFT = 4
+
+    def __init__(self, boards):
+        self._boards = []
+        self._slots = {}
+        seen = set()
+        for port, address in boards:
+            if not 0 <= address <= self.MAX_ADDRESS:
+                raise ValueError(f"Invalid board address {address} on port {port} (valid range: 0-{self.MAX_ADDRESS})")
+            if (port, address) in seen:
+                raise ValueError(f"Duplicate board address {address} on port {port}")
+            seen.add((port, address))
+
+            first_number = len(self._slots) + 1
+            self._boards.append(Board(port, address, first_number))
+            for channel in range(self.CHANNELS_PER_BOARD):
+                self._slots[first_number + channel] = BoardSlot(port, address, channel)
+
+        if not self._boards:
+            raise ValueError("Board map is empty")
+
+    @classmethod
+    def single(cls, port: str, addresses=(PacketByte.DEFAULT_ADDR.value,)):
+        return cls([(port, address) for address in addresses])
+
+    @classmethod
+    def parse(cls, spec: str):
+        """
+        Parse a board map such as "/dev/ttyUSB0=0,1;/dev/ttyUSB1=0"
+        A port without "=" gets a single board at the default address
+        """
+        boards = []
+        for entry in filter(None, (part.strip() for part in spec.split(';'))):
+            port, _, addresses = entry.partition('=')
+            if not addresses:
+                boards.append((port.strip(), PacketByte.DEFAULT_ADDR.value))
+                continue
+            try:
+                boards.extend((port.strip(), int(address, 0)) for address in addresses.split(','))
+            except ValueError:
+                raise ValueError(f"Invalid board map entry: {entry}")
+        return cls(boards)
+
+    @classmethod
+    def address_byte(cls, address: int, channel: int = 0) -> int:
+        """Board address in the high nibble, channel in the low nibble"""
+        return (address << cls.ADDRESS_SHIFT) | channel
+
+    def locate(self, locker_number: int):
+        return self._slots.get(locker_number)
+
+    def ports(self) -> list:
+        return list(dict.fromkeys(board.port for board in self._boards))
+
+    def boards(self, port: str = None) -> list:
+        return [board for board in self._boards if port is None or board.port == port]
+
+    def numbers(self, port: str = None) -> list:
+        return [number for number, slot in self._slots.items() if port is None or slot.port == port]
+
+    def __len__(self):
+        return len(self._slots)
@@ -0,0 +1,74 @@
+import asyncio
+import itertools
+import logging
+import queue
+import threading
+
+logger = logging.getLogger('locker')
+
+
+def _resolve(future: asyncio.Future, result=None, error: Exception = None):
+    if future.cancelled():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class BusScheduler:
+    """
+    Single owner of one RS-485 locker bus
+    Commands are queued by priority (see BusPriority) and executed one at a time
+    on a dedicated I/O thread, so a command's write and its reply can never
+    interleave with another command on the same port
+    """
+
+    def __init__(self, locker, name: str = "locker-bus"):
+        self.locker = locker
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        logger.debug("Bus scheduler %s started", name)
+
+    def submit(self, priority: int, func, *args) -> asyncio.Future:
+        """
+        Queue func(*args) to run on the bus thread
+        Returns a future resolved on the calling event loop with the command's result
+        """
+        if self._closed:
+            raise RuntimeError("Bus scheduler is closed")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._queue.put((priority, next(self._sequence), func, args, future, loop))
+        return future
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            _, _, func, args, future, loop = self._queue.get()
+            if func is None:
+                break
+            if future.cancelled():
+                continue
+
+            try:
+                result = func(*args)
+            except Exception as e:
+                loop.call_soon_threadsafe(_resolve, future, None, e)
+            else:
+                loop.call_soon_threadsafe(_resolve, future, result)
+
+    def close(self):
+        """Stop accepting commands, finish the queued ones and stop the bus thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((float('inf'), next(self._sequence), None, (), None, None))
+        self._thread.join()
+        logger.debug("Bus scheduler stopped")
@@ -1,4 +1,4 @@
-from enum import Enum
+from enum import Enum, IntEnum
 
 class LockerCommand(Enum):
     """
@@ -31,3 +31,11 @@ class ResponseIndex(Enum):
     RESERVED1 = 6     # 예약된 바이트 1 / Reserved byte 1
     RESERVED2 = 7     # 예약된 바이트 2 / Reserved byte 2
     CHECKSUM = 8      # 체크섬 위치 / Checksum position
+
+class BusPriority(IntEnum):
+    """
+    버스 명령 우선순위 (낮을수록 먼저 처리)
+    Bus command priorities (lower runs first)
+    """
+    UNLOCK = 0  # 잠금 해제 및 확인 / Unlock and its verification reads
+    POLL = 1    # 주기적 상태 확인 / Routine status polling
@@ -0,0 +1,65 @@
+import logging
+
+from .constants import PacketByte, ResponseIndex
+
+logger = logging.getLogger('locker')
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for board response frames
+    Bytes are fed as they arrive; garbage before STX is discarded and a frame
+    with a bad ETX or checksum is dropped by resyncing on the next STX, so one
+    corrupted frame never desynchronizes the following ones
+    """
+    FRAME_LENGTH = ResponseIndex.CHECKSUM.value + 1
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.bad_frames = 0
+        self.discarded_bytes = 0
+
+    @staticmethod
+    def checksum(data) -> int:
+        return sum(data) & 0xFF
+
+    @classmethod
+    def is_valid(cls, frame) -> bool:
+        return (len(frame) == cls.FRAME_LENGTH
+                and frame[ResponseIndex.STX.value] == PacketByte.STX.value
+                and frame[ResponseIndex.ETX.value] == PacketByte.ETX.value
+                and frame[ResponseIndex.CHECKSUM.value] == cls.checksum(frame[:ResponseIndex.CHECKSUM.value]))
+
+    def reset(self):
+        self._buffer.clear()
+
+    def feed(self, data) -> list:
+        """Add received bytes and return the complete, valid frames decoded so far"""
+        self._buffer += data
+        frames = []
+
+        while self._buffer:
+            start = self._buffer.find(PacketByte.STX.value)
+            if start < 0:
+                self.discarded_bytes += len(self._buffer)
+                self._buffer.clear()
+                break
+            if start:
+                self.discarded_bytes += start
+                del self._buffer[:start]
+
+            if len(self._buffer) < self.FRAME_LENGTH:
+                break
+
+            frame = bytes(self._buffer[:self.FRAME_LENGTH])
+            if self.is_valid(frame):
+                frames.append(frame)
+                del self._buffer[:self.FRAME_LENGTH]
+            else:
+                self.bad_frames += 1
+                self.discarded_bytes += 1
+                del self._buffer[:1]
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Dropped invalid frame: %s", frame.hex(' '))
+
+        return frames
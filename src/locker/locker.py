@@ -1,131 +1,273 @@
 import logging
 import time
 import serial
+from .board_map import BoardMap
 from .constants import LockerCommand, PacketByte, ResponseIndex
+from .frame_decoder import FrameDecoder
+from .locker_states import LockerStates
+from src.utils.metrics import Counter, Histogram
+
+logger = logging.getLogger('locker')
+
+# Lets serial_for_url open sim:// ports (see protocol_sim.py)
+if __package__ not in serial.protocol_handler_packages:
+    serial.protocol_handler_packages.append(__package__)
+
+SERIAL_TRANSACTION_SECONDS = Histogram(
+    'locker_serial_transaction_seconds', 'Time to send a command frame and receive its reply', ['port', 'command'])
+SERIAL_TIMEOUTS = Counter('locker_serial_timeouts_total', 'Commands that got no reply in time', ['port'])
+SERIAL_BAD_FRAMES = Counter('locker_serial_bad_frames_total', 'Reply frames dropped for a bad layout or checksum', ['port'])
+
 
 class Locker:
-    MAX_LOCKER = 16
-    MIN_LOCKER = 1
-    RESPONSE_LENGTH = 9
+    UNLOCK_SETTLE_TIME = 0.025
+    STATE_MAX_AGE = 1.0
+    RESYNC_GRACE = 0.05
 
-    def __init__(self, port: str):
+    def __init__(self, port: str, state_max_age: float = STATE_MAX_AGE, board_map: BoardMap = None):
+        self.port = port
+        self.board_map = board_map or BoardMap.single(port)
+        self.boards = self.board_map.boards(port)
+        self.locker_numbers = self.board_map.numbers(port)
+        if not self.boards:
+            raise Exception(f"No locker boards configured for port {port}")
+        self.state_max_age = state_max_age
+        self._snapshot = None
+        self._decoder = FrameDecoder()
+        self._transaction_seconds = {command.value: SERIAL_TRANSACTION_SECONDS.labels(port, command.name.lower())
+                                     for command in LockerCommand}
+        self._timeouts = SERIAL_TIMEOUTS.labels(port)
+        self._bad_frames = SERIAL_BAD_FRAMES.labels(port)
         try:
-            self.ser = serial.Serial(
-                port=port,
+            self.ser = serial.serial_for_url(
+                port,
                 baudrate=19200,
                 parity=serial.PARITY_NONE,
                 stopbits=serial.STOPBITS_ONE,
                 bytesize=serial.EIGHTBITS,
                 timeout=1
             )
-            logging.info(f"Serial port {port} connected successfully")
-        except serial.SerialException as e:
+            logger.info("Serial port %s connected successfully", port)
+        except (serial.SerialException, ValueError) as e:
             raise Exception(f"Port connection failed: {str(e)}")
 
     def close(self):
         if hasattr(self, 'ser') and self.ser.is_open:
             self.ser.close()
-            logging.debug("Serial connection closed properly")
+            logger.debug("Serial connection closed properly")
+
+    def is_valid_locker_number(self, locker_number: int) -> bool:
+        slot = self.board_map.locate(locker_number)
+        if not slot or slot.port != self.port:
+            logger.error("Invalid locker number: %s (not mapped to port %s)", locker_number, self.port)
+            return False
+        return True
+
+    @staticmethod
+    def build_packet(address: int, command: LockerCommand) -> bytearray:
+        packet = bytearray([
+            PacketByte.STX.value,
+            address,
+            command.value,
+            PacketByte.ETX.value
+        ])
+        packet.append(sum(packet) & 0xFF)
+        return packet
+
+    def transact(self, packet: bytearray, expect_response: bool = False):
+        """
+        Send one command frame and wait for its reply
+        Stale bytes left over from an earlier timed-out command are discarded first,
+        then the reply is decoded from the byte stream; garbage is skipped and the
+        reply must echo the address and command of the packet that was sent
+        Returns the reply frame, or None when no reply is expected or none is valid
+        """
+        started = time.perf_counter()
+        bad_frames = self._decoder.bad_frames
+        try:
+            return self._transact(packet, expect_response)
+        finally:
+            command = packet[ResponseIndex.CMD.value]
+            if command in self._transaction_seconds:
+                self._transaction_seconds[command].observe(time.perf_counter() - started)
+            if self._decoder.bad_frames > bad_frames:
+                self._bad_frames.inc(self._decoder.bad_frames - bad_frames)
+
+    def _transact(self, packet: bytearray, expect_response: bool):
+        self.ser.reset_input_buffer()
+        self._decoder.reset()
+        self.ser.write(packet)
+        if not expect_response:
+            return None
+
+        deadline = time.monotonic() + self.ser.timeout
+        corrupted = False
+        while time.monotonic() < deadline:
+            if corrupted and not self.ser.in_waiting:
+                # Never block on a full read timeout while waiting for a resync
+                time.sleep(0.005)
+                continue
+            chunk = self.ser.read(self.ser.in_waiting or 1)
+            if not chunk:
+                continue
 
-    def get_all_locker_states(self) -> dict:
+            bad_frames = self._decoder.bad_frames
+            for frame in self._decoder.feed(chunk):
+                if (frame[ResponseIndex.ADDR.value] == packet[ResponseIndex.ADDR.value]
+                        and frame[ResponseIndex.CMD.value] == packet[ResponseIndex.CMD.value]):
+                    return frame
+                logger.warning("Discarding response that does not match command: %s", frame.hex(' '))
+
+            if self._decoder.bad_frames > bad_frames and not corrupted:
+                # The reply was most likely the corrupted frame; only wait briefly for a resync
+                corrupted = True
+                deadline = min(deadline, time.monotonic() + self.RESYNC_GRACE)
+
+        if corrupted:
+            logger.error("Hardware communication error: Corrupted response frame")
+        else:
+            self._timeouts.inc()
+            logger.error("Hardware communication error: Response timeout")
+        return None
+
+    def read_board_states(self, board) -> LockerStates:
         """
-        Get the status of all lockers at once
-        Returns a dictionary with locker numbers as keys and locked status as values
+        Read the status of the 16 lockers on one board
+        Returns the states keyed by global locker numbers, or None on failure
         """
         try:
-            cmd = bytearray([
-                PacketByte.STX.value,
-                PacketByte.DEFAULT_ADDR.value,
-                LockerCommand.STATUS.value,
-                PacketByte.ETX.value,
-                0x35
-            ])
-            self.ser.write(cmd)
-            logging.debug("Checking status of all lockers")
-
-            response = self.ser.read(self.RESPONSE_LENGTH)
-            if len(response) != self.RESPONSE_LENGTH:
-                logging.error(f"Invalid response length from hardware: {len(response)}")
-                return {i: True for i in range(self.MIN_LOCKER, self.MAX_LOCKER + 1)}
-
-            if response[ResponseIndex.STX.value] != PacketByte.STX.value:
-                logging.error("Hardware communication error: Invalid start byte")
-                return {i: True for i in range(self.MIN_LOCKER, self.MAX_LOCKER + 1)}
-
-            states = {}
-            # Process lockers 1-8
-            for i in range(8):
-                states[i + 1] = bool((response[ResponseIndex.STATUS_1_8.value] >> i) & 0x01)
-            # Process lockers 9-16
-            for i in range(8):
-                states[i + 9] = bool((response[ResponseIndex.STATUS_9_16.value] >> i) & 0x01)
-
-            logging.debug(f"All locker states retrieved: {states}")
-            return states
+            cmd = self.build_packet(BoardMap.address_byte(board.address), LockerCommand.STATUS)
+            logger.debug("Checking status of board %s on %s", board.address, self.port)
+
+            response = self.transact(cmd, expect_response=True)
+            if response is None:
+                return None
+
+            # Channels 1-8 in the low byte, 9-16 in the high byte
+            status = response[ResponseIndex.STATUS_1_8.value] | (response[ResponseIndex.STATUS_9_16.value] << 8)
+            return LockerStates.from_board(board.first_number, status, BoardMap.CHANNELS_PER_BOARD)
 
         except serial.SerialException as e:
-            logging.error(f"Hardware communication failure: {str(e)}")
-            return {i: True for i in range(self.MIN_LOCKER, self.MAX_LOCKER + 1)}
+            logger.error("Hardware communication failure on board %s: %s", board.address, e)
+            return None
         except Exception as e:
-            logging.error(f"Unexpected error while checking locker status: {str(e)}")
-            return {i: True for i in range(self.MIN_LOCKER, self.MAX_LOCKER + 1)}
+            logger.error("Unexpected error while checking status of board %s: %s", board.address, e)
+            return None
 
-    def is_locked(self, locker_number: int) -> bool:
-        if not self.MIN_LOCKER <= locker_number <= self.MAX_LOCKER:
-            logging.error(f"Invalid locker number: {locker_number} (valid range: {self.MIN_LOCKER}-{self.MAX_LOCKER})")
+    def get_all_locker_states(self) -> LockerStates:
+        """
+        Get the status of all lockers on every board of this port
+        Returns the states keyed by locker number
+        Lockers on a board that could not be read are left out as unknown
+        """
+        states = LockerStates()
+        complete = True
+        for board in self.boards:
+            board_states = self.read_board_states(board)
+            if board_states is None:
+                complete = False
+                continue
+            states.update(board_states)
+
+        self._snapshot = states if complete else None
+        logger.debug("All locker states retrieved: locked=%#x mask=%#x", states.locked, states.mask)
+        return states
+
+    def get_cached_locker_states(self, max_age: float = None):
+        """
+        Return the states from the last successful status read if it is not older
+        than max_age seconds (defaults to state_max_age), otherwise None
+        """
+        snapshot = self._snapshot
+        if max_age is None:
+            max_age = self.state_max_age
+        if snapshot and snapshot.age() <= max_age:
+            return snapshot
+        return None
+
+    def is_locked(self, locker_number: int, use_cache: bool = False) -> bool:
+        """Whether the locker is locked; an unknown state counts as locked"""
+        if not self.is_valid_locker_number(locker_number):
             return True
 
+        if use_cache:
+            # Only a cached "locked" is trusted; an unlocked door may have been shut since
+            states = self.get_cached_locker_states()
+            if states is not None and states.get(locker_number, True):
+                return True
+
         states = self.get_all_locker_states()
         return states.get(locker_number, True)
 
+    def send_unlock(self, locker_number: int):
+        slot = self.board_map.locate(locker_number)
+        self.transact(self.build_packet(BoardMap.address_byte(slot.address, slot.channel), LockerCommand.UNLOCK))
+        logger.debug("Sent unlock command to locker %s", locker_number)
+
     def open(self, locker_number: int) -> bool:
-        if not self.MIN_LOCKER <= locker_number <= self.MAX_LOCKER:
-            logging.error(f"Invalid locker number: {locker_number} (valid range: {self.MIN_LOCKER}-{self.MAX_LOCKER})")
+        if not self.is_valid_locker_number(locker_number):
             return False
 
         try:
-            if not self.is_locked(locker_number):
-                logging.debug(f"Locker {locker_number} is already in unlocked state")
+            if not self.is_locked(locker_number, use_cache=True):
+                logger.debug("Locker %s is already in unlocked state", locker_number)
                 return True
 
-            packet = bytearray([
-                PacketByte.STX.value,
-                locker_number - 1,
-                LockerCommand.UNLOCK.value,
-                PacketByte.ETX.value
-            ])
-            packet.append(sum(packet) & 0xFF)
-
-            self.ser.write(packet)
-            logging.debug(f"Sent unlock command to locker {locker_number}")
-            time.sleep(0.025)
+            self.send_unlock(locker_number)
+            time.sleep(self.UNLOCK_SETTLE_TIME)
 
             success = not self.is_locked(locker_number)
             if success:
-                logging.debug(f"Locker {locker_number} unlocked successfully")
+                logger.debug("Locker %s unlocked successfully", locker_number)
             else:
-                logging.error(f"Failed to unlock locker {locker_number}")
+                logger.error("Failed to unlock locker %s", locker_number)
             return success
 
         except serial.SerialException as e:
-            logging.error(f"Hardware communication failure during unlock: {str(e)}")
+            logger.error("Hardware communication failure during unlock: %s", e)
             return False
         except Exception as e:
-            logging.error(f"Unexpected error while unlocking locker: {str(e)}")
+            logger.error("Unexpected error while unlocking locker: %s", e)
             return False
 
-    def open_all(self) -> bool:
-        success = True
-        failed_lockers = []
-
-        for i in range(self.MIN_LOCKER, self.MAX_LOCKER + 1):
-            if not self.open(i):
-                success = False
-                failed_lockers.append(i)
+    def send_unlocks(self, locker_numbers):
+        for locker_number in locker_numbers:
+            self.send_unlock(locker_number)
 
+    @staticmethod
+    def log_bulk_results(results: dict):
+        failed_lockers = [number for number, success in results.items() if not success]
         if failed_lockers:
-            logging.error(f"Failed to open lockers: {failed_lockers}")
+            logger.error("Failed to open lockers: %s", failed_lockers)
         else:
-            logging.debug("All lockers opened successfully")
+            logger.debug("Lockers opened successfully: %s", list(results))
 
-        return success
\ No newline at end of file
+    def open_many(self, locker_numbers) -> dict:
+        """
+        Open several lockers with one status read, back-to-back unlock frames,
+        a single settle delay and one verification read
+        Returns a dictionary with locker numbers as keys and unlock success as values
+        """
+        results = {number: False for number in locker_numbers}
+        numbers = [number for number in results if self.is_valid_locker_number(number)]
+
+        try:
+            states = self.get_all_locker_states()
+            to_unlock = [number for number in numbers if states.get(number, True)]
+            if to_unlock:
+                self.send_unlocks(to_unlock)
+                time.sleep(self.UNLOCK_SETTLE_TIME)
+                states = self.get_all_locker_states()
+            results.update({number: not states.get(number, True) for number in numbers})
+
+        except serial.SerialException as e:
+            logger.error("Hardware communication failure during bulk unlock: %s", e)
+        except Exception as e:
+            logger.error("Unexpected error while unlocking lockers: %s", e)
+
+        self.log_bulk_results(results)
+        return results
+
+    def open_all(self) -> bool:
+        results = self.open_many(self.locker_numbers)
+        return all(results.values())
@@ -0,0 +1,114 @@
+import time
+
+
+class LockerStates:
+    """
+    Lock state of many lockers packed into two integer bitmasks
+    Bit n-1 stands for locker n: `mask` marks the lockers whose state is known and
+    `locked` holds that state, so two readings are diffed with a single XOR
+    A locker outside the mask is unknown (e.g. its board did not answer), which
+    get() reports as None rather than guessing locked or unlocked
+    `timestamp` is the monotonic time of the oldest board read in the reading
+    Read access mirrors a dict of locker number to locked flag
+    """
+    __slots__ = ('locked', 'mask', 'timestamp')
+
+    def __init__(self, locked: int = 0, mask: int = 0, timestamp: float = None):
+        self.locked = locked & mask
+        self.mask = mask
+        self.timestamp = time.monotonic() if timestamp is None else timestamp
+
+    @staticmethod
+    def bit(locker_number: int) -> int:
+        return 1 << (locker_number - 1)
+
+    @staticmethod
+    def numbers(bits: int):
+        """Locker numbers of the set bits, lowest first"""
+        while bits:
+            low = bits & -bits
+            yield low.bit_length()
+            bits ^= low
+
+    @classmethod
+    def from_board(cls, first_number: int, status: int, channels: int = 16):
+        """States of one board from its status word (bit i set = channel i locked)"""
+        shift = first_number - 1
+        board_mask = (1 << channels) - 1
+        return cls((status & board_mask) << shift, board_mask << shift)
+
+    @classmethod
+    def from_dict(cls, states: dict):
+        result = cls()
+        for number, is_locked in states.items():
+            result.set(number, is_locked)
+        return result
+
+    def update(self, other: 'LockerStates'):
+        """Overwrite the lockers covered by another reading"""
+        self.locked = (self.locked & ~other.mask) | other.locked
+        self.mask |= other.mask
+        self.timestamp = min(self.timestamp, other.timestamp)
+
+    def age(self) -> float:
+        return time.monotonic() - self.timestamp
+
+    def set(self, locker_number: int, is_locked: bool):
+        bit = self.bit(locker_number)
+        self.mask |= bit
+        if is_locked:
+            self.locked |= bit
+        else:
+            self.locked &= ~bit
+
+    def discard(self, locker_number: int):
+        bit = self.bit(locker_number)
+        self.mask &= ~bit
+        self.locked &= ~bit
+
+    def changed(self, other: 'LockerStates') -> int:
+        """Bits of the lockers covered by both readings whose state differs"""
+        return (self.locked ^ other.locked) & self.mask & other.mask
+
+    def get(self, locker_number: int, default=None):
+        bit = self.bit(locker_number)
+        if not self.mask & bit:
+            return default
+        return bool(self.locked & bit)
+
+    def __getitem__(self, locker_number: int) -> bool:
+        state = self.get(locker_number)
+        if state is None:
+            raise KeyError(locker_number)
+        return state
+
+    def __contains__(self, locker_number: int) -> bool:
+        return bool(self.mask & self.bit(locker_number))
+
+    def __iter__(self):
+        return self.numbers(self.mask)
+
+    def __len__(self):
+        return bin(self.mask).count('1')
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [bool(self.locked & self.bit(number)) for number in self]
+
+    def items(self):
+        return [(number, bool(self.locked & self.bit(number))) for number in self]
+
+    def copy(self) -> 'LockerStates':
+        return LockerStates(self.locked, self.mask, self.timestamp)
+
+    def __eq__(self, other):
+        if isinstance(other, LockerStates):
+            return self.locked == other.locked and self.mask == other.mask
+        if isinstance(other, dict):
+            return dict(self.items()) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"LockerStates({dict(self.items())})"
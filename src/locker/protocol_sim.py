@@ -0,0 +1,2 @@
+"""pySerial URL handler for sim://, see LockerBusSimulator"""
+from .simulator import LockerBusSimulator as Serial  # noqa: F401
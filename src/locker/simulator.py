@@ -0,0 +1,237 @@
+import random
+import threading
+import time
+from collections import deque
+from urllib.parse import parse_qs, urlsplit
+
+from serial.serialutil import PortNotOpenError, SerialBase, SerialException, to_bytes
+
+from .board_map import BoardMap
+from .constants import LockerCommand, PacketByte
+
+
+class SimulatedDoor:
+    """
+    Latch and door of one simulated locker
+    An unlock releases the latch after unlock_delay; with auto_close the door is
+    shut again (and latched) that many seconds after it opened
+    """
+    __slots__ = ('locked', 'unlock_at', 'relock_at')
+
+    def __init__(self, locked: bool = True):
+        self.locked = locked
+        self.unlock_at = None
+        self.relock_at = None
+
+    def is_locked(self, now: float) -> bool:
+        if self.unlock_at is not None and now >= self.unlock_at:
+            self.locked = False
+            self.unlock_at = None
+        if self.relock_at is not None and now >= self.relock_at:
+            self.locked = True
+            self.relock_at = None
+        return self.locked
+
+    def unlock(self, now: float, unlock_delay: float, auto_close: float = None):
+        if not self.is_locked(now) or self.unlock_at is not None:
+            return
+        self.unlock_at = now + unlock_delay
+        if auto_close is not None:
+            self.relock_at = self.unlock_at + auto_close
+
+    def close(self):
+        self.locked = True
+        self.unlock_at = None
+        self.relock_at = None
+
+
+class LockerBusSimulator(SerialBase):
+    """
+    pySerial port that behaves like a serial bus of locker boards
+    Host frames (STX ADDR CMD ETX CHECKSUM) are parsed from the written bytes; frames
+    with a bad checksum or for an absent board get no reply, as on real hardware
+    Status replies (STX ADDR CMD S1-8 S9-16 ETX R1 R2 CHECKSUM) arrive after the
+    board latency plus the wire time at the configured baud rate and can lose
+    bytes or be preceded by line noise
+
+    URL: sim://[name][?option=value&...]
+      boards        board addresses separated by '+' (default: all 0-15)
+      latency       board response time in seconds (default: 0.003)
+      loss          probability of dropping each reply byte (default: 0)
+      noise         probability of garbage bytes before a reply (default: 0)
+      jam           probability an unlock command is ignored (default: 0)
+      unlock_delay  seconds for the latch to release after an unlock (default: 0.01)
+      auto_close    seconds a door stays open before it is shut again (default: stays open)
+      seed          random seed for reproducible runs
+    """
+    URL_SCHEME = "sim"
+
+    def __init__(self, *args, **kwargs):
+        self.boards = list(range(BoardMap.MAX_ADDRESS + 1))
+        self.latency = 0.003
+        self.loss = 0.0
+        self.noise = 0.0
+        self.jam = 0.0
+        self.unlock_delay = 0.01
+        self.auto_close = None
+        self.rng = random.Random()
+        self.doors = {}
+        self.stats = {'frames': 0, 'bad_frames': 0, 'ignored_frames': 0, 'status_replies': 0, 'unlocks': 0}
+        self._tx = bytearray()
+        self._rx = bytearray()
+        self._in_flight = deque()
+        self._lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def open(self):
+        if self.is_open:
+            raise SerialException("Port is already open.")
+        if self._port is None:
+            raise SerialException("Port must be configured before it can be used.")
+        self.from_url(self._port)
+        self.doors = {address: [SimulatedDoor() for _ in range(BoardMap.CHANNELS_PER_BOARD)]
+                      for address in self.boards}
+        self.is_open = True
+        self.reset_input_buffer()
+
+    def from_url(self, url: str):
+        parts = urlsplit(url)
+        if parts.scheme != self.URL_SCHEME:
+            raise SerialException(f"Expected a URL of the form sim://[name][?option=value], got {url!r}")
+        try:
+            for option, values in parse_qs(parts.query, keep_blank_values=True).items():
+                value = values[-1]
+                if option == 'boards':
+                    self.boards = [int(address, 0) for address in value.split('+')]
+                elif option in ('latency', 'loss', 'noise', 'jam', 'unlock_delay', 'auto_close'):
+                    setattr(self, option, float(value))
+                elif option == 'seed':
+                    self.rng.seed(int(value))
+                else:
+                    raise ValueError(f"unknown option: {option!r}")
+        except ValueError as e:
+            raise SerialException(f"Invalid sim:// URL {url!r}: {str(e)}")
+
+    def close(self):
+        self.is_open = False
+        super().close()
+
+    def _reconfigure_port(self):
+        pass
+
+    def _update_dtr_state(self):
+        pass
+
+    def _update_rts_state(self):
+        pass
+
+    @property
+    def byte_time(self) -> float:
+        # 8N1: start bit, 8 data bits and a stop bit per byte
+        return 10 / self._baudrate
+
+    def door(self, address: int, channel: int) -> SimulatedDoor:
+        return self.doors[address][channel]
+
+    def door_for(self, locker_number: int) -> SimulatedDoor:
+        """Door of a locker number, counting 16 per board in ascending address order"""
+        index = locker_number - 1
+        return self.doors[sorted(self.doors)[index // BoardMap.CHANNELS_PER_BOARD]][
+            index % BoardMap.CHANNELS_PER_BOARD]
+
+    def _deliver(self, now: float):
+        while self._in_flight and self._in_flight[0][0] <= now:
+            self._rx += self._in_flight.popleft()[1]
+
+    @property
+    def in_waiting(self) -> int:
+        with self._lock:
+            self._deliver(time.monotonic())
+            return len(self._rx)
+
+    def read(self, size: int = 1) -> bytes:
+        if not self.is_open:
+            raise PortNotOpenError()
+        deadline = None if self._timeout is None else time.monotonic() + self._timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._deliver(now)
+                if len(self._rx) >= size or (deadline is not None and now >= deadline):
+                    data = bytes(self._rx[:size])
+                    del self._rx[:size]
+                    return data
+                next_at = self._in_flight[0][0] if self._in_flight else float('inf')
+            wake_at = min(next_at, deadline if deadline is not None else float('inf'))
+            time.sleep(min(max(wake_at - now, 0.0001), 0.05))
+
+    def write(self, data) -> int:
+        if not self.is_open:
+            raise PortNotOpenError()
+        data = to_bytes(data)
+        with self._lock:
+            self._tx += data
+            # The board only starts working once the whole frame is on the wire
+            self._parse_frames(time.monotonic() + len(data) * self.byte_time)
+        return len(data)
+
+    def reset_input_buffer(self):
+        with self._lock:
+            # Only bytes already received are dropped; replies still on the wire arrive later
+            self._deliver(time.monotonic())
+            self._rx.clear()
+
+    def reset_output_buffer(self):
+        with self._lock:
+            self._tx.clear()
+
+    def flush(self):
+        pass
+
+    def _parse_frames(self, now: float):
+        while True:
+            start = self._tx.find(PacketByte.STX.value)
+            if start < 0:
+                self._tx.clear()
+                return
+            del self._tx[:start]
+            if len(self._tx) < 5:
+                return
+
+            frame = bytes(self._tx[:5])
+            if frame[3] != PacketByte.ETX.value or sum(frame[:4]) & 0xFF != frame[4]:
+                self.stats['bad_frames'] += 1
+                del self._tx[:1]
+                continue
+            del self._tx[:5]
+            self.stats['frames'] += 1
+            self._handle_frame(frame[1], frame[2], now)
+
+    def _handle_frame(self, address_byte: int, command: int, now: float):
+        address, channel = address_byte >> BoardMap.ADDRESS_SHIFT, address_byte & 0x0F
+        doors = self.doors.get(address)
+        if doors is None:
+            self.stats['ignored_frames'] += 1
+            return
+
+        if command == LockerCommand.UNLOCK.value:
+            self.stats['unlocks'] += 1
+            if self.rng.random() >= self.jam:
+                doors[channel].unlock(now, self.unlock_delay, self.auto_close)
+        elif command == LockerCommand.STATUS.value:
+            ready_at = now + self.latency
+            status = sum(1 << i for i, door in enumerate(doors) if door.is_locked(ready_at))
+            reply = bytearray([PacketByte.STX.value, address_byte, command, status & 0xFF, status >> 8,
+                               PacketByte.ETX.value, 0x00, 0x00])
+            reply.append(sum(reply) & 0xFF)
+            self._send(bytes(reply), ready_at)
+            self.stats['status_replies'] += 1
+        else:
+            self.stats['ignored_frames'] += 1
+
+    def _send(self, reply: bytes, ready_at: float):
+        if self.noise and self.rng.random() < self.noise:
+            reply = bytes(self.rng.randrange(256) for _ in range(self.rng.randint(1, 4))) + reply
+        if self.loss:
+            reply = bytes(byte for byte in reply if self.rng.random() >= self.loss)
+        self._in_flight.append((ready_at + len(reply) * self.byte_time, reply))
@@ -0,0 +1,316 @@
+import logging
+import time
+from postgrest.exceptions import APIError
+from supabase import acreate_client, AsyncClient
+
+from .status_batcher import StorageStatusBatcher
+from .ttl_cache import TTLCache
+from src.utils.metrics import Counter, Histogram
+
+logger = logging.getLogger('supa_db')
+
+DB_QUERY_SECONDS = Histogram('supa_db_query_seconds', 'PostgREST query latency by the method issuing it', ['method'])
+DB_QUERY_ERRORS = Counter('supa_db_query_errors_total', 'Failed PostgREST queries by the method issuing it', ['method'])
+
+
+class AsyncSupaDB:
+    """
+    Supabase data access built on the async Supabase client
+    All PostgREST calls share one pooled HTTP/2 connection and never block
+    the event loop
+    """
+    PRIVILEGED_ROLES = ('deliver', 'manager')
+    CACHE_SIZE = 1024
+    ROLE_CACHE_TTL = 300
+    STORAGE_CACHE_TTL = 600
+
+    def __init__(self, client: AsyncClient):
+        self.client = client
+        # Only rarely changing fields are cached; laundry assignment and payment always come from the DB
+        self.role_cache = TTLCache(self.CACHE_SIZE, self.ROLE_CACHE_TTL)
+        self.storage_number_cache = TTLCache(self.CACHE_SIZE, self.STORAGE_CACHE_TTL)
+        self.status_batcher = StorageStatusBatcher(self.update_storage_statuses)
+        self._joined_context = True
+        self._incremental_sync = True
+        logger.info("AsyncSupaDB initialized")
+
+    @classmethod
+    async def create(cls, database_url: str, jwt: str):
+        try:
+            client = await acreate_client(database_url, jwt)
+        except Exception as e:
+            raise Exception(f"Failed to initialize AsyncSupaDB: {str(e)}")
+        return cls(client)
+
+    async def close(self):
+        try:
+            await self.client.postgrest.aclose()
+            logger.debug("AsyncSupaDB connection closed")
+        except Exception as e:
+            logger.warning("Error closing AsyncSupaDB connection: %s", e)
+
+    async def _execute(self, method: str, query):
+        """Run a PostgREST query, recording its latency and failures under the calling method"""
+        started = time.perf_counter()
+        try:
+            return await query.execute()
+        except Exception:
+            DB_QUERY_ERRORS.labels(method).inc()
+            raise
+        finally:
+            DB_QUERY_SECONDS.labels(method).observe(time.perf_counter() - started)
+
+    def register_cache_invalidation(self, realtime_service):
+        """Keep the caches fresh from realtime changes on profiles and storages"""
+        for table in ('profiles', 'storages'):
+            for event in ('UPDATE', 'DELETE'):
+                realtime_service.subscribe_changes(table, event, self.handle_cache_event)
+        # Events may have been missed while disconnected
+        realtime_service.add_connect_listener(self.clear_caches)
+
+    def clear_caches(self):
+        self.role_cache.clear()
+        self.storage_number_cache.clear()
+        logger.debug("AsyncSupaDB caches cleared")
+
+    def handle_cache_event(self, payload):
+        data = payload.get('data', {})
+        caches = {
+            'profiles': (self.role_cache, 'role'),
+            'storages': (self.storage_number_cache, 'number'),
+        }
+        if data.get('table') not in caches:
+            return
+
+        cache, field = caches[data['table']]
+        record = data.get('record') or {}
+        if data.get('type') == 'UPDATE' and 'id' in record and field in record:
+            cache.set(record['id'], record[field])
+        else:
+            cache.invalidate(record.get('id') or (data.get('old_record') or {}).get('id'))
+        logger.debug("Cache updated from %s on %s", data.get('type'), data['table'])
+
+    async def get_user_role(self, user_id: str):
+        role = self.role_cache.get(user_id)
+        if role is not TTLCache.MISSING:
+            return role
+        try:
+            logger.debug("Looking up role for user: %s", user_id)
+            query = self.client.table('profiles').select('role').eq('id', user_id)
+            result = await self._execute('get_user_role', query)
+            if result.data:
+                logger.debug("Found role for user %s: %s", user_id, result.data[0]['role'])
+                self.role_cache.set(user_id, result.data[0]['role'])
+                return result.data[0]['role']
+            logger.debug("No role found for user: %s", user_id)
+            return None
+        except Exception as e:
+            logger.error("Role lookup failed for user %s: %s", user_id, e)
+            return None
+
+    async def get_open_request_context(self, request_id: str, storage_id: str, user_id: str):
+        """
+        Everything needed to authorize an open request: storage number, laundry id,
+        laundry paid flag and requester role
+        Fetched with one embedded select through the request row; falls back to
+        narrow per-table lookups if the schema does not expose those relationships
+        Privileged requests with a cached role and storage number need no query at all
+        Returns None if the storage does not exist
+        """
+        role = self.role_cache.get(user_id)
+        if role in self.PRIVILEGED_ROLES:
+            number = self.storage_number_cache.get(storage_id)
+            if number is not TTLCache.MISSING:
+                # Laundry state does not matter for privileged roles
+                return {'number': number, 'laundry_id': None, 'paid': None, 'role': role}
+
+        if self._joined_context:
+            try:
+                query = self.client.table('locker_open_requests') \
+                    .select('storage:storages!storage_id(number, laundry_id, laundry:laundry!laundry_id(paid)),'
+                            'requester:profiles!requested_by(role)') \
+                    .eq('id', request_id)
+                result = await self._execute('get_open_request_context', query)
+                if result.data and result.data[0]['storage']:
+                    storage = result.data[0]['storage']
+                    requester = result.data[0]['requester'] or {}
+                    laundry = storage['laundry'] or {}
+                    self.storage_number_cache.set(storage_id, storage['number'])
+                    if requester.get('role'):
+                        self.role_cache.set(user_id, requester['role'])
+                    return {
+                        'number': storage['number'],
+                        'laundry_id': storage['laundry_id'],
+                        'paid': laundry.get('paid'),
+                        'role': requester.get('role')
+                    }
+                if result.data:
+                    logger.debug("No storage found with id: %s", storage_id)
+                    return None
+                logger.debug("Request %s not visible yet, using per-table lookups", request_id)
+            except APIError as e:
+                # PGRST2xx: relationship missing or ambiguous in the schema cache
+                if str(e.code or '').startswith('PGRST2'):
+                    self._joined_context = False
+                logger.warning("Joined request lookup failed, using per-table lookups: %s", e)
+            except Exception as e:
+                logger.warning("Joined request lookup failed, using per-table lookups: %s", e)
+
+        return await self._get_open_request_context_by_table(storage_id, user_id)
+
+    async def _get_open_request_context_by_table(self, storage_id: str, user_id: str):
+        try:
+            query = self.client.table('storages').select('number, laundry_id').eq('id', storage_id)
+            result = await self._execute('get_open_request_context_by_table', query)
+            if not result.data:
+                logger.debug("No storage found with id: %s", storage_id)
+                return None
+            storage = result.data[0]
+            self.storage_number_cache.set(storage_id, storage['number'])
+
+            role = await self.get_user_role(user_id)
+            paid = None
+            if role not in self.PRIVILEGED_ROLES and storage['laundry_id']:
+                query = self.client.table('laundry').select('paid').eq('id', storage['laundry_id'])
+                result = await self._execute('get_open_request_context_by_table', query)
+                paid = result.data[0]['paid'] if result.data else None
+
+            return {
+                'number': storage['number'],
+                'laundry_id': storage['laundry_id'],
+                'paid': paid,
+                'role': role
+            }
+        except Exception as e:
+            logger.error("Request context lookup failed for storage %s: %s", storage_id, e)
+            return None
+
+    async def get_pending_requests(self, since: str, page_size: int = 100):
+        """
+        Open requests still pending and created at or after the given ISO timestamp, oldest first
+        Pages through the results with a (created_at, id) cursor, so rows sharing a
+        created_at across a page boundary are not skipped
+        """
+        requests = []
+        try:
+            while True:
+                query = self.client.table('locker_open_requests') \
+                    .select('id, storage_id, requested_by, created_at') \
+                    .eq('status', 'pending')
+                if not requests:
+                    query = query.gte('created_at', since)
+                else:
+                    last = requests[-1]
+                    query = query.or_(f'created_at.gt."{last["created_at"]}",'
+                                      f'and(created_at.eq."{last["created_at"]}",id.gt."{last["id"]}")')
+                query = query.order('created_at').order('id').limit(page_size)
+                result = await self._execute('get_pending_requests', query)
+                requests.extend(result.data)
+                if len(result.data) < page_size:
+                    break
+            logger.debug("Found %s pending requests since %s", len(requests), since)
+        except Exception as e:
+            logger.error("Failed to fetch pending requests: %s", e)
+        return requests
+
+    async def get_all_storages(self, columns: str = '*'):
+        try:
+            logger.debug("Fetching all storages")
+            result = await self._execute('get_all_storages', self.client.table('storages').select(columns))
+            if result.data:
+                logger.debug("Found %s storages", len(result.data))
+                for storage in result.data:
+                    self.storage_number_cache.set(storage['id'], storage['number'])
+                return result.data
+            logger.debug("No storages found")
+            return None
+        except Exception as e:
+            logger.error("Failed to fetch all storages: %s", e)
+            return None
+
+    async def get_storages_changed_since(self, since: str = None):
+        """
+        Id, number and updated_at of storages updated at or after the given ISO timestamp,
+        oldest first; all storages if since is None
+        Returns None on failure, or if the table has no updated_at column
+        """
+        if not self._incremental_sync:
+            return None
+        try:
+            query = self.client.table('storages').select('id, number, updated_at')
+            if since:
+                # Inclusive so rows sharing the watermark timestamp are not skipped
+                query = query.gte('updated_at', since)
+            result = await self._execute('get_storages_changed_since', query.order('updated_at'))
+            for storage in result.data:
+                self.storage_number_cache.set(storage['id'], storage['number'])
+            logger.debug("Found %s storages changed since %s", len(result.data), since)
+            return result.data
+        except APIError as e:
+            # 42703: undefined column
+            if e.code == '42703':
+                self._incremental_sync = False
+                logger.warning("Storages have no updated_at column, incremental sync disabled")
+            else:
+                logger.error("Failed to fetch changed storages: %s", e)
+            return None
+        except Exception as e:
+            logger.error("Failed to fetch changed storages: %s", e)
+            return None
+
+    async def update_request_status(self, request_id: str, status: str) -> bool:
+        """
+        Conditionally move a request from pending to a final status
+        Returns True only if this call performed the transition
+        """
+        try:
+            logger.debug("Updating request %s status to %s", request_id, status)
+            query = self.client.table('locker_open_requests') \
+                .update({'status': status}) \
+                .eq('id', request_id) \
+                .eq('status', 'pending')
+            result = await self._execute('update_request_status', query)
+            if not result.data:
+                logger.debug("Request %s is no longer pending", request_id)
+                return False
+            logger.debug("Successfully updated request %s to %s", request_id, status)
+            return True
+        except Exception as e:
+            logger.error("Failed to update request %s status: %s", request_id, e)
+            return False
+
+    async def free_storage(self, storage_id: str):
+        try:
+            logger.debug("Freeing storage: %s", storage_id)
+            query = self.client.table('storages') \
+                .update({
+                'status': 'open',
+                'allocated_to': None,
+                'allocated_by': None,
+                'laundry_id': None
+            }) \
+                .eq('id', storage_id)
+            await self._execute('free_storage', query)
+            logger.debug("Successfully freed storage %s", storage_id)
+        except Exception as e:
+            logger.error("Failed to free storage %s: %s", storage_id, e)
+
+    async def update_storage_statuses(self, statuses: dict):
+        """
+        Write the lock state of several storages, one request per distinct status
+        Raises on failure so the caller can retry
+        """
+        by_status = {}
+        for storage_id, is_locked in statuses.items():
+            by_status.setdefault('closed' if is_locked else 'open', []).append(storage_id)
+
+        for status, storage_ids in by_status.items():
+            logger.debug("Updating %s storages to %s", len(storage_ids), status)
+            query = self.client.table('storages') \
+                .update({'status': status}) \
+                .in_('id', storage_ids)
+            await self._execute('update_storage_statuses', query)
+
+    def queue_storage_status(self, storage_id: str, is_locked: bool):
+        """Queue a storage lock state for the next batched write"""
+        self.status_batcher.put(storage_id, is_locked)
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+
+logger = logging.getLogger('supa_db')
+
+
+class StorageStatusBatcher:
+    """
+    Write-behind buffer for storage lock states
+    Changes are coalesced per storage (last write wins) and flushed together
+    every flush_interval seconds or as soon as max_batch storages are pending;
+    a failed flush is re-queued and retried with exponential back-off
+    """
+
+    def __init__(self, flush_func, flush_interval: float = 0.2, max_batch: int = 50,
+                 max_retry_delay: float = 30.0):
+        self.flush_func = flush_func
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_retry_delay = max_retry_delay
+        self._pending = {}
+        self._wake = asyncio.Event()
+        self._retry_delay = flush_interval
+        self._is_running = False
+
+    def put(self, storage_id: str, is_locked: bool):
+        self._pending[storage_id] = is_locked
+        if len(self._pending) >= self.max_batch:
+            self._wake.set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def flush(self) -> bool:
+        if not self._pending:
+            return True
+
+        batch, self._pending = self._pending, {}
+        try:
+            await self.flush_func(batch)
+            logger.debug("Flushed status of %s storages", len(batch))
+            self._retry_delay = self.flush_interval
+            return True
+        except Exception as e:
+            # Newer changes queued during the flush win over the failed batch
+            for storage_id, is_locked in batch.items():
+                self._pending.setdefault(storage_id, is_locked)
+            self._retry_delay = min(self._retry_delay * 2, self.max_retry_delay)
+            logger.error("Storage status flush failed, retrying in %.1fs: %s", self._retry_delay, e)
+            return False
+
+    async def run(self):
+        self._is_running = True
+        try:
+            while self._is_running:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self._retry_delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+                await self.flush()
+        finally:
+            await self.flush()
+
+    def stop(self):
+        self._is_running = False
+        self._wake.set()
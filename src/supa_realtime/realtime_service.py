@@ -1,55 +1,133 @@
 import asyncio
 import logging
+import random
+import time
 import websockets
 from realtime import AsyncRealtimeClient
 from typing import Callable
 
+from src.utils.metrics import Counter, Gauge
 from src.utils.suppress_log import temporary_log_level
 
+logger = logging.getLogger('supa_realtime')
+
+REALTIME_CONNECTED = Gauge('realtime_connected', 'Whether the realtime socket is connected and subscribed')
+REALTIME_RECONNECTS = Counter('realtime_reconnects_total', 'Successful realtime connections after the first one')
+REALTIME_CONNECT_FAILURES = Counter('realtime_connect_failures_total', 'Failed realtime connection attempts')
+REALTIME_HEARTBEAT_FAILURES = Counter('realtime_heartbeat_failures_total', 'Realtime heartbeats that got no pong')
+
 
 class RealtimeService:
+    RECONNECT_BASE_DELAY = 0.5  # seconds
+    RECONNECT_MAX_DELAY = 30  # seconds
+    HEARTBEAT_INTERVAL = 5  # seconds
+    HEARTBEAT_TIMEOUT = 5  # seconds
+    STABLE_CONNECTION = 60  # seconds a connection must last to reset the back-off
+    BROADCAST_TOPIC = "locker-states"
+    BROADCAST_TIMEOUT = 1  # seconds
+
     def __init__(self, url: str, jwt: str):
         self.url = url
         self.jwt = jwt
         self.callback = None
         self._socket = None
         self._channel = None
+        self._broadcast_channel = None
         self._is_running = False
         self._reconnect_attempts = 0
-        self._max_reconnect_attempts = 5
-        self._reconnect_delay = 5  # seconds
-        logging.info(f"RealtimeService initialized with URL: {url}")
+        self._table_listeners = []
+        self._tasks = set()
+        self._connect_listeners = []
+        logger.info("RealtimeService initialized with URL: %s", url)
 
     def set_callback(self, callback: Callable):
         self.callback = callback
-        logging.debug("Callback function set")
+        logger.debug("Callback function set")
+
+    def subscribe_changes(self, table: str, event: str, callback: Callable):
+        """
+        Also deliver postgres changes of another public table on the same channel
+        Takes effect on the next (re)subscription
+        """
+        self._table_listeners.append((table, event, callback))
+        logger.debug("Listener added for %s on %s", event, table)
+
+    def add_connect_listener(self, callback: Callable):
+        """Register a callable invoked after every successful (re)connection"""
+        self._connect_listeners.append(callback)
+
+    def _notify_connected(self):
+        for callback in self._connect_listeners:
+            try:
+                result = callback()
+                if asyncio.iscoroutine(result):
+                    self._spawn(result)
+            except Exception as e:
+                logger.error("Connect listener failed: %s", e)
+
+    def _listener_wrapper(self, callback: Callable):
+        def wrapper(payload):
+            try:
+                callback(payload)
+            except Exception as e:
+                logger.error("Change listener failed: %s", e)
+        return wrapper
 
     def _callback_wrapper(self, payload):
         if self.callback:
-            logging.debug(f"Received payload: {payload}")
-            asyncio.create_task(self.callback(payload))
+            logger.debug("Received payload: %s", payload)
+            try:
+                result = self.callback(payload)
+            except Exception as e:
+                logger.error("Callback failed: %s", e)
+                return
+            if asyncio.iscoroutine(result):
+                self._spawn(result)
         else:
-            logging.warning("Callback received but no callback function is set")
+            logger.warning("Callback received but no callback function is set")
+
+    def _spawn(self, coro):
+        # Keep a reference so the task is not garbage collected and its errors get logged
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Callback task failed: %s", task.exception())
 
     async def _cleanup_channel(self):
-        """Clean up existing channel subscription"""
+        """Clean up existing channel subscriptions"""
+        await self._cleanup_broadcast_channel()
         if self._channel:
             try:
                 await self._channel.unsubscribe()
-                logging.debug("Existing channel unsubscribed")
+                logger.debug("Existing channel unsubscribed")
             except Exception as e:
-                logging.warning(f"Error unsubscribing channel: {str(e)}")
+                logger.warning("Error unsubscribing channel: %s", e)
             finally:
                 self._channel = None
 
+    async def _cleanup_broadcast_channel(self):
+        if self._broadcast_channel:
+            try:
+                await self._broadcast_channel.unsubscribe()
+                logger.debug("Broadcast channel unsubscribed")
+            except Exception as e:
+                logger.warning("Error unsubscribing broadcast channel: %s", e)
+            finally:
+                self._broadcast_channel = None
+
     async def _cleanup_socket(self):
         """Clean up existing socket connection"""
         if self._socket:
             try:
-                await self._socket.close()
-                logging.debug("Existing socket closed")
+                if self._socket.is_connected:
+                    await asyncio.wait_for(self._socket.close(), timeout=self.HEARTBEAT_TIMEOUT)
+                logger.debug("Existing socket closed")
             except Exception as e:
-                logging.warning(f"Error closing socket: {str(e)}")
+                logger.warning("Error closing socket: %s", e)
             finally:
                 self._socket = None
 
@@ -60,23 +138,56 @@ class RealtimeService:
 
             # Create and setup new channel
             self._channel = self._socket.channel("realtime:public:locker_open_requests")
-            logging.info("Channel created")
+            logger.info("Channel created")
 
             # Setup subscription
-            await self._channel.on_postgres_changes(
+            self._channel.on_postgres_changes(
                 event="INSERT",
                 schema="public",
                 table="locker_open_requests",
                 callback=self._callback_wrapper
-            ).subscribe()
+            )
+            for table, event, callback in self._table_listeners:
+                self._channel.on_postgres_changes(
+                    event=event,
+                    schema="public",
+                    table=table,
+                    callback=self._listener_wrapper(callback)
+                )
+            await self._channel.subscribe()
 
-            logging.info("Channel subscribed successfully")
+            logger.info("Channel subscribed successfully")
             return True
         except Exception as e:
-            logging.error(f"Channel setup failed: {str(e)}")
+            logger.error("Channel setup failed: %s", e)
             await self._cleanup_channel()
             return False
 
+    async def _setup_broadcast_channel(self):
+        try:
+            self._broadcast_channel = self._socket.channel(self.BROADCAST_TOPIC)
+            await self._broadcast_channel.subscribe()
+            logger.info("Broadcast channel %s subscribed", self.BROADCAST_TOPIC)
+        except Exception as e:
+            # Broadcasts are best effort; clients still see the DB writes
+            logger.warning("Broadcast channel setup failed: %s", e)
+            await self._cleanup_broadcast_channel()
+
+    async def broadcast(self, event: str, payload: dict) -> bool:
+        """
+        Publish a message to clients on the broadcast channel over the shared socket
+        Best effort: returns False without queueing if the channel is not joined
+        """
+        channel = self._broadcast_channel
+        if not channel or not channel.is_joined or not self._socket.is_connected:
+            return False
+        try:
+            await asyncio.wait_for(channel.send_broadcast(event, payload), timeout=self.BROADCAST_TIMEOUT)
+            return True
+        except Exception as e:
+            logger.warning("Broadcast of %s failed: %s", event, str(e) or type(e).__name__)
+            return False
+
     async def _connect_socket(self):
         try:
             # Cleanup existing socket
@@ -90,74 +201,123 @@ class RealtimeService:
                     auto_reconnect=False
                 )
                 await self._socket.connect()
-            logging.debug("New socket connected")
+            logger.debug("New socket connected")
             return True
         except Exception as e:
-            logging.error(f"Socket connection failed: {str(e)}")
+            logger.error("Socket connection failed: %s", e)
             await self._cleanup_socket()
             return False
 
     async def establish_connection(self):
-        logging.info("Establishing socket connection...")
+        logger.info("Establishing socket connection...")
         try:
             if not await self._connect_socket():
-                logging.warning("Failed to connect socket")
+                logger.warning("Failed to connect socket")
                 return False
 
-            logging.info("Socket connected successfully")
+            logger.info("Socket connected successfully")
 
             if not await self._setup_channel():
-                logging.warning("Failed to setup channel")
+                logger.warning("Failed to setup channel")
                 await self._cleanup_socket()
                 return False
 
+            await self._setup_broadcast_channel()
             return True
 
         except Exception as e:
-            logging.error(f"Connection establishment failed: {str(e)}")
+            logger.error("Connection establishment failed: %s", e)
             await self._cleanup_socket()
             return False
 
+    def _reconnect_delay(self) -> float:
+        """Exponential back-off with full jitter; the first retry after a stable connection drops is immediate"""
+        if not self._reconnect_attempts:
+            return 0
+        ceiling = min(self.RECONNECT_MAX_DELAY, self.RECONNECT_BASE_DELAY * 2 ** (self._reconnect_attempts - 1))
+        return random.uniform(0, ceiling)
+
+    async def _heartbeat(self):
+        """Return as soon as the socket stops answering websocket pings"""
+        while True:
+            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+            try:
+                pong = await self._socket.ws_connection.ping()
+                await asyncio.wait_for(pong, timeout=self.HEARTBEAT_TIMEOUT)
+            except Exception as e:
+                REALTIME_HEARTBEAT_FAILURES.inc()
+                logger.warning("Realtime heartbeat failed: %s", str(e) or type(e).__name__)
+                return
+
+    async def _listen(self):
+        listen_task = asyncio.create_task(self._socket.listen())
+        heartbeat_task = asyncio.create_task(self._heartbeat())
+        try:
+            done, _ = await asyncio.wait({listen_task, heartbeat_task}, return_when=asyncio.FIRST_COMPLETED)
+            if listen_task in done:
+                listen_task.result()
+        finally:
+            for task in (listen_task, heartbeat_task):
+                task.cancel()
+            await asyncio.gather(listen_task, heartbeat_task, return_exceptions=True)
+
     async def start_listening(self):
         self._is_running = True
         self._reconnect_attempts = 0
+        connected_at = None
+        connected_before = False
 
         while self._is_running:
             try:
                 if not self._socket or not self._socket.is_connected:
-                    if self._reconnect_attempts >= self._max_reconnect_attempts:
-                        raise RuntimeError("Failed to establish realtime connection after maximum retries")
+                    delay = self._reconnect_delay()
+                    if delay:
+                        logger.warning("Reconnecting in %.1fs (attempt %s)", delay, self._reconnect_attempts + 1)
+                        await asyncio.sleep(delay)
 
-                    logging.warning(
-                        f"Socket disconnected, attempting to reconnect... (Attempt {self._reconnect_attempts + 1}/{self._max_reconnect_attempts})")
-                    success = await self.establish_connection()
-
-                    if not success:
+                    if not await self.establish_connection():
+                        REALTIME_CONNECT_FAILURES.inc()
                         self._reconnect_attempts += 1
-                        await asyncio.sleep(self._reconnect_delay)
                         continue
 
-                    self._reconnect_attempts = 0
-                    logging.info("Successfully reconnected")
+                    connected_at = time.monotonic()
+                    if connected_before:
+                        REALTIME_RECONNECTS.inc()
+                    connected_before = True
+                    REALTIME_CONNECTED.set(1)
+                    logger.info("Successfully connected")
+                    self._notify_connected()
 
-                await self._socket.listen()
+                await self._listen()
+                if self._is_running:
+                    logger.warning("Realtime connection lost")
 
-            except websockets.exceptions.ConnectionClosedError:
-                raise Exception("Connection closed by server")
+            except asyncio.CancelledError:
+                raise
+            except websockets.exceptions.WebSocketException as e:
+                logger.warning("Realtime connection closed: %s", e)
             except Exception as e:
-                if self._is_running:
-                    if isinstance(e, websockets.exceptions.WebSocketException):
-                        raise Exception(f"WebSocket error: {str(e)}")
-                    raise RuntimeError(f"Realtime service critical failure: {str(e)}")
+                logger.error("Realtime listener error: %s", e)
+
+            REALTIME_CONNECTED.set(0)
+            if self._is_running:
+                # A connection that drops right away counts as a failed attempt, avoiding restart storms
+                if connected_at and time.monotonic() - connected_at >= self.STABLE_CONNECTION:
+                    self._reconnect_attempts = 0
+                else:
+                    self._reconnect_attempts += 1
+                connected_at = None
+                await self._cleanup_channel()
+                await self._cleanup_socket()
 
     async def stop_listening(self):
         self._is_running = False
         await self._cleanup_channel()
         await self._cleanup_socket()
-        logging.warning("Service stopped and connection closed")
+        logger.warning("Service stopped and connection closed")
 
     async def test_connection(self):
-        logging.info("Testing connection...")
+        logger.info("Testing connection...")
         temp_socket = None
         try:
             with temporary_log_level(logging.WARNING):
@@ -168,15 +328,15 @@ class RealtimeService:
                 )
                 await temp_socket.connect()
 
-            logging.info("Test connection successful")
+            logger.info("Test connection successful")
             return True
         except Exception as e:
-            logging.error(f"Test connection failed: {str(e)}")
+            logger.error("Test connection failed: %s", e)
             return False
         finally:
             if temp_socket:
                 try:
                     await temp_socket.close()
-                    logging.debug("Test connection closed")
+                    logger.debug("Test connection closed")
                 except:
                     pass
@@ -1,36 +1,91 @@
 import logging
 import os
 import colorlog
-import asyncio
-from logging.handlers import TimedRotatingFileHandler
-from queue import Queue
+import threading
+import time
+from logging.handlers import QueueHandler, TimedRotatingFileHandler
+from queue import Empty, Queue
 import atexit
 from datetime import datetime, timezone, timedelta
 
 # KST 시간대 설정
 KST = timezone(timedelta(hours=9))
 
-class KSTFormatter(logging.Formatter):
-    def converter(self, timestamp):
-        dt = datetime.fromtimestamp(timestamp, tz=timezone.utc)
-        return dt.astimezone(KST)
+# Loggers of the service subsystems; each level can be set separately (see setup_logger)
+SUBSYSTEMS = ('locker', 'supa_db', 'handler', 'supa_realtime', 'metrics')
 
-    def formatTime(self, record, datefmt=None):
-        dt = self.converter(record.created)
-        if datefmt:
-            return dt.strftime(datefmt)
-        return dt.strftime('%Y-%m-%d %H:%M:%S')
+def parse_subsystem_levels(value: str) -> dict:
+    """Parse "locker=WARNING,supa_realtime=DEBUG" into {'locker': 30, 'supa_realtime': 10}"""
+    levels = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        name, _, level = item.partition('=')
+        level_number = logging.getLevelName(level.strip().upper())
+        if name.strip() not in SUBSYSTEMS or not isinstance(level_number, int):
+            raise ValueError(f"Invalid subsystem log level: {item!r} (subsystems: {', '.join(SUBSYSTEMS)})")
+        levels[name.strip()] = level_number
+    return levels
+
+class KSTTimeMixin:
+    """
+    Formats record times in KST
+    The default timestamp has one-second resolution, so it is formatted once per
+    second and reused for every other record logged in that second
+    """
+    _cached_time = (None, None)
 
-class KSTColoredFormatter(colorlog.ColoredFormatter):
     def converter(self, timestamp):
-        dt = datetime.fromtimestamp(timestamp, tz=timezone.utc)
-        return dt.astimezone(KST)
+        return datetime.fromtimestamp(timestamp, tz=KST)
 
     def formatTime(self, record, datefmt=None):
-        dt = self.converter(record.created)
         if datefmt:
-            return dt.strftime(datefmt)
-        return dt.strftime('%Y-%m-%d %H:%M:%S')
+            return self.converter(record.created).strftime(datefmt)
+        second = int(record.created)
+        cached_second, text = self._cached_time
+        if second != cached_second:
+            text = self.converter(second).strftime('%Y-%m-%d %H:%M:%S')
+            self._cached_time = (second, text)
+        return text
+
+class KSTFormatter(KSTTimeMixin, logging.Formatter):
+    pass
+
+class KSTColoredFormatter(KSTTimeMixin, colorlog.ColoredFormatter):
+    pass
+
+class RepeatedMessageFilter(logging.Filter):
+    """
+    Rate limits identical WARNING and higher messages
+    During a hardware outage every poll fails the same way; after the first
+    message, repeats within `interval` seconds are dropped and counted, and the
+    next one to get through reports how many were suppressed
+    """
+
+    def __init__(self, interval: float = 60.0, level: int = logging.WARNING, max_keys: int = 1000):
+        super().__init__()
+        self.interval = interval
+        self.level = level
+        self.max_keys = max_keys
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno < self.level:
+            return True
+        message = record.getMessage()
+        key = (record.name, record.levelno, message)
+        now = time.monotonic()
+        with self._lock:
+            last, suppressed = self._seen.get(key, (None, 0))
+            if last is not None and now - last < self.interval:
+                self._seen[key] = (last, suppressed + 1)
+                return False
+            if len(self._seen) >= self.max_keys:
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.interval}
+            self._seen[key] = (now, 0)
+        if suppressed:
+            record.msg = f"{message} (repeated {suppressed} more times in the last {now - last:.0f}s)"
+            record.args = None
+        return True
 
 class KSTTimedRotatingFileHandler(TimedRotatingFileHandler):
     def computeRollover(self, currentTime):
@@ -38,43 +93,100 @@ class KSTTimedRotatingFileHandler(TimedRotatingFileHandler):
         kst_diff = timedelta(hours=9).seconds
         return result - kst_diff
 
-class AsyncBufferedKSTTimedRotatingFileHandler(KSTTimedRotatingFileHandler):
-    def __init__(self, filename, when='h', interval=1, backup_count=0, encoding=None,
-                 buffer_size=1000, flush_interval=300):
-        super().__init__(filename, when, interval, backup_count, encoding=encoding)
-        self.queue = Queue()
+class BufferedKSTTimedRotatingFileHandler(KSTTimedRotatingFileHandler):
+    """
+    Rotating file handler that leaves flushing to the log writer thread
+    Records collect in the file buffer until flush_buffer() is called
+    """
+
+    def flush(self):
+        # StreamHandler.emit flushes after every record; batching is up to LogQueueListener
+        pass
+
+    def flush_buffer(self):
+        super().flush()
+
+    def close(self):
+        self.flush_buffer()
+        super().close()
+
+class LogQueueListener:
+    """
+    Writes queued log records to the real handlers on a background thread
+    Files are flushed every flush_interval seconds, every buffer_size records
+    and right after an ERROR or CRITICAL record; stop() drains the queue first
+    """
+    _sentinel = None
+
+    def __init__(self, queue, handlers, buffer_size=1000, flush_interval=1.0):
+        self.queue = queue
+        self.handlers = handlers
         self.buffer_size = buffer_size
         self.flush_interval = flush_interval
-        self._stop_event = asyncio.Event()
-        self._flush_task = None
+        self._thread = None
 
-    def emit(self, record):
-        if not self._stop_event.is_set():
-            self.queue.put(record)
-            if self.queue.qsize() >= self.buffer_size:
-                self.flush_buffer()
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self._thread.start()
 
-    def flush_buffer(self):
-        while not self.queue.empty():
-            record = self.queue.get()
-            super().emit(record)
-        self.flush()
+    def stop(self):
+        if self._thread:
+            self.queue.put(self._sentinel)
+            self._thread.join()
+            self._thread = None
+
+    def handle(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
 
-    async def periodic_flush(self):
-        while not self._stop_event.is_set():
-            self.flush_buffer()
+    def flush(self):
+        for handler in self.handlers:
             try:
-                await asyncio.sleep(self.flush_interval)
-            except asyncio.CancelledError:
+                if isinstance(handler, BufferedKSTTimedRotatingFileHandler):
+                    handler.flush_buffer()
+                else:
+                    handler.flush()
+            except Exception:
+                handler.handleError(None)
+
+    def _run(self):
+        unflushed = 0
+        last_flush = time.monotonic()
+        while True:
+            urgent = False
+            try:
+                # Nothing to flush, so sleep until the next record
+                timeout = max(0.0, last_flush + self.flush_interval - time.monotonic()) if unflushed else None
+                record = self.queue.get(timeout=timeout)
+                if record is self._sentinel:
+                    break
+                self.handle(record)
+                unflushed += 1
+                urgent = record.levelno >= logging.ERROR
+            except Empty:
+                pass
+
+            if unflushed and (urgent or unflushed >= self.buffer_size
+                              or time.monotonic() - last_flush >= self.flush_interval):
+                self.flush()
+                unflushed = 0
+                last_flush = time.monotonic()
+
+        # Drain whatever was logged before stop()
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except Empty:
                 break
-        self.flush_buffer()
+            if record is not self._sentinel:
+                self.handle(record)
+        self.flush()
 
-    def close(self):
-        self._stop_event.set()
-        self.flush_buffer()
-        super().close()
+_listener = None
 
 def cleanup_logger():
+    global _listener
     for handler in logging.getLogger().handlers[:]:
         try:
             handler.close()
@@ -82,40 +194,53 @@ def cleanup_logger():
             pass
         logging.getLogger().removeHandler(handler)
 
-def setup_logger(log_dir='logs', log_level=logging.INFO):
+    if _listener:
+        _listener.stop()
+        for handler in _listener.handlers:
+            try:
+                handler.close()
+            except:
+                pass
+        _listener = None
+
+def setup_logger(log_dir='logs', log_level=logging.INFO, buffer_size=1000, flush_interval=1.0,
+                 subsystem_levels=None, repeat_interval=60.0):
+    """
+    Log to files and the console through a queue, so logging calls never wait on I/O
+    Only a QueueHandler sits on the root logger; LogQueueListener writes on its own thread
+    subsystem_levels maps a name from SUBSYSTEMS to its own level (others follow log_level)
+    """
+    global _listener
     cleanup_logger()
+    handlers = []
     if not os.path.exists(log_dir):
         os.makedirs(log_dir)
 
-    debug_handler = AsyncBufferedKSTTimedRotatingFileHandler(
+    debug_handler = BufferedKSTTimedRotatingFileHandler(
         filename=os.path.join(log_dir, 'debug.log'),
         when='midnight',
         interval=1,
-        backup_count=1,
-        encoding='utf-8',
-        buffer_size=1000,
-        flush_interval=300
+        backupCount=1,
+        encoding='utf-8'
     )
     debug_handler.setLevel(logging.DEBUG)
     debug_formatter = KSTFormatter('[%(asctime)s] %(levelname)s: %(message)s')
     debug_handler.setFormatter(debug_formatter)
     debug_handler.addFilter(lambda record: record.levelno == logging.DEBUG)
-    logging.getLogger().addHandler(debug_handler)
+    handlers.append(debug_handler)
 
-    general_handler = AsyncBufferedKSTTimedRotatingFileHandler(
+    general_handler = BufferedKSTTimedRotatingFileHandler(
         filename=os.path.join(log_dir, 'service.log'),
         when='midnight',
         interval=1,
-        backup_count=1,
-        encoding='utf-8',
-        buffer_size=1000,
-        flush_interval=300
+        backupCount=1,
+        encoding='utf-8'
     )
     general_handler.setLevel(logging.INFO)
     general_formatter = KSTFormatter('[%(asctime)s] %(levelname)s: %(message)s')
     general_handler.setFormatter(general_formatter)
     general_handler.addFilter(lambda record: logging.INFO <= record.levelno < logging.ERROR)
-    logging.getLogger().addHandler(general_handler)
+    handlers.append(general_handler)
 
     error_handler = KSTTimedRotatingFileHandler(
         filename=os.path.join(log_dir, 'error.log'),
@@ -127,7 +252,7 @@ def setup_logger(log_dir='logs', log_level=logging.INFO):
     error_formatter = KSTFormatter('\n[%(asctime)s]\nERROR: %(message)s\n' + '-'*50)
     error_handler.setFormatter(error_formatter)
     error_handler.addFilter(lambda record: record.levelno == logging.ERROR)
-    logging.getLogger().addHandler(error_handler)
+    handlers.append(error_handler)
 
     critical_handler = KSTTimedRotatingFileHandler(
         filename=os.path.join(log_dir, 'critical.log'),
@@ -138,7 +263,7 @@ def setup_logger(log_dir='logs', log_level=logging.INFO):
     critical_handler.setLevel(logging.CRITICAL)
     critical_formatter = KSTFormatter('\n[%(asctime)s]\nCRITICAL: %(message)s\n' + '-'*50)
     critical_handler.setFormatter(critical_formatter)
-    logging.getLogger().addHandler(critical_handler)
+    handlers.append(critical_handler)
 
     console_handler = colorlog.StreamHandler()
     console_formatter = KSTColoredFormatter(
@@ -152,13 +277,16 @@ def setup_logger(log_dir='logs', log_level=logging.INFO):
         }
     )
     console_handler.setFormatter(console_formatter)
-    logging.getLogger().addHandler(console_handler)
+    handlers.append(console_handler)
+
+    _listener = LogQueueListener(Queue(), handlers, buffer_size, flush_interval)
+    _listener.start()
+    queue_handler = QueueHandler(_listener.queue)
+    if repeat_interval:
+        queue_handler.addFilter(RepeatedMessageFilter(repeat_interval))
+    logging.getLogger().addHandler(queue_handler)
 
     logging.getLogger().setLevel(log_level)
+    for name in SUBSYSTEMS:
+        logging.getLogger(name).setLevel((subsystem_levels or {}).get(name, logging.NOTSET))
     atexit.register(cleanup_logger)
-
-    # Start periodic flush tasks for buffered handlers
-    loop = asyncio.get_event_loop()
-    for handler in logging.getLogger().handlers:
-        if isinstance(handler, AsyncBufferedKSTTimedRotatingFileHandler):
-            handler._flush_task = loop.create_task(handler.periodic_flush())
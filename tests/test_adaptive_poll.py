@@ -0,0 +1,38 @@
+import asyncio
+import time
+
+from src.handler.adaptive_poll import AdaptivePollInterval
+
+
+def test_idle_back_off_to_ceiling():
+    """
+    변화가 없을 때 상태 확인 주기가 최대값까지 증가하는지 테스트
+    Test that the idle poll interval backs off up to the ceiling
+    """
+    poll = AdaptivePollInterval(min_interval=0.1, max_interval=1.0, decay=2.0)
+    intervals = [poll.next_interval() for _ in range(6)]
+    assert intervals == [0.1, 0.2, 0.4, 0.8, 1.0, 1.0]
+
+
+def test_activity_restores_fast_rate():
+    """
+    활동 발생 시 빠른 주기로 복귀하는지 테스트
+    Test that activity switches back to the fast rate for the fast window
+    """
+    poll = AdaptivePollInterval(min_interval=0.1, max_interval=1.0, fast_window=60)
+    for _ in range(5):
+        poll.next_interval()
+    poll.notify_activity()
+    assert [poll.next_interval() for _ in range(3)] == [0.1, 0.1, 0.1]
+
+
+async def test_activity_wakes_sleeping_poll():
+    """
+    잠금 해제 알림이 대기 중인 상태 확인을 즉시 깨우는지 테스트
+    Test that an activity notification cuts the current sleep short
+    """
+    poll = AdaptivePollInterval(min_interval=5.0, max_interval=5.0)
+    started = time.monotonic()
+    asyncio.get_running_loop().call_later(0.05, poll.notify_activity)
+    await poll.sleep()
+    assert time.monotonic() - started < 1.0
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import pytest
+
+from src.locker.async_locker import AsyncLocker
+
+# 시뮬레이터 사물함 버스 포트 (실제 하드웨어 불필요)
+# Simulated locker bus port, no hardware required
+LOCKER_PORT = 'sim://async?latency=0.001&unlock_delay=0.005&seed=1'
+
+
+@pytest.fixture
+def async_locker():
+    """
+    시뮬레이터 위에서 동작하는 AsyncLocker 픽스처
+    Fixture providing an AsyncLocker on the simulated locker bus
+    """
+    locker = AsyncLocker(LOCKER_PORT)
+    yield locker
+    locker.close()
+
+
+def bus(locker: AsyncLocker, port: str = LOCKER_PORT):
+    return locker.lockers[port].ser
+
+
+def is_door_locked(locker: AsyncLocker, number: int) -> bool:
+    return bus(locker).door_for(number).is_locked(time.monotonic())
+
+
+async def test_get_all_locker_states(async_locker):
+    """
+    전체 사물함 상태 비동기 조회 테스트
+    Test for awaiting the status of all lockers
+    """
+    bus(async_locker).door_for(3).locked = False
+    states = await async_locker.get_all_locker_states()
+    assert len(states) == 16
+    assert states[3] is False
+    assert states[1] is True
+
+
+async def test_open(async_locker):
+    """
+    사물함 비동기 열기 테스트
+    Test for awaiting a locker unlock
+    """
+    assert await async_locker.open(5)
+    assert not is_door_locked(async_locker, 5)
+    assert not await async_locker.is_locked(5)
+
+
+async def test_slow_read_does_not_block_event_loop(async_locker):
+    """
+    느린 시리얼 응답이 이벤트 루프를 막지 않는지 테스트
+    Test that a slow serial read does not freeze the event loop
+    """
+    bus(async_locker).latency = 0.2
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    task = asyncio.create_task(ticker())
+    await async_locker.get_all_locker_states()
+    task.cancel()
+    assert ticks >= 10
+
+
+def status_reads(locker: AsyncLocker) -> int:
+    return bus(locker).stats['status_replies']
+
+
+async def test_open_uses_fresh_snapshot_for_pre_check(async_locker):
+    """
+    최근 상태 스냅샷이 있으면 열기 전 상태 확인을 생략하는지 테스트
+    Test that open() skips the pre-check read when a fresh snapshot exists
+    """
+    await async_locker.get_all_locker_states()
+    assert await async_locker.open(2)
+    # 1 poll + 1 post-unlock verification only
+    assert status_reads(async_locker) == 2
+
+
+async def test_open_ignores_expired_snapshot():
+    """
+    만료된 스냅샷은 사용하지 않는지 테스트
+    Test that an expired snapshot forces a fresh pre-check read
+    """
+    locker = AsyncLocker(LOCKER_PORT, state_max_age=0)
+    try:
+        await locker.get_all_locker_states()
+        await asyncio.sleep(0.01)
+        assert await locker.open(2)
+        assert status_reads(locker) == 3
+    finally:
+        locker.close()
+
+
+async def test_open_many_uses_single_verification_sweep(async_locker):
+    """
+    일괄 열기가 상태 확인 2회로 처리되는지 테스트
+    Test that a bulk open costs one status read and one verification read
+    """
+    bus(async_locker).door_for(4).locked = False
+    results = await async_locker.open_many([1, 4, 9, 17])
+
+    assert results == {1: True, 4: True, 9: True, 17: False}
+    assert status_reads(async_locker) == 2
+    # 이미 열린 4번에는 열림 명령을 보내지 않음 / no unlock frame for the already open locker 4
+    assert bus(async_locker).stats['unlocks'] == 2
+    assert not is_door_locked(async_locker, 1) and not is_door_locked(async_locker, 9)
+
+
+async def test_open_all(async_locker):
+    """
+    전체 사물함 열기 테스트
+    Test for opening all lockers
+    """
+    assert await async_locker.open_all()
+    assert not any(is_door_locked(async_locker, number) for number in range(1, 17))
+    assert status_reads(async_locker) == 2
@@ -0,0 +1,30 @@
+import re
+from types import SimpleNamespace
+
+from supabase import acreate_client
+
+from src.supa_db.async_supa_db import AsyncSupaDB
+
+
+async def test_pending_requests_page_boundary_keeps_equal_timestamps():
+    """
+    페이지 경계에서 created_at 이 같은 대기 요청을 건너뛰지 않는지 테스트
+    Test that pending requests sharing a created_at across a page boundary are all returned
+    """
+    rows = [{'id': f"r{i}", 'storage_id': 's1', 'requested_by': 'u1',
+             'created_at': '2026-01-01T00:00:01+00:00' if i < 5 else '2026-01-01T00:00:02+00:00'}
+            for i in range(7)]
+    supa_db = AsyncSupaDB(await acreate_client("http://127.0.0.1:1", "stand.in.jwt"))
+
+    async def execute(method, query):
+        params = dict(query.params)
+        if 'or' in params:
+            created_at, request_id = re.search(r'created_at\.gt\."([^"]+)".*id\.gt\."([^"]+)"', params['or']).groups()
+            matches = [row for row in rows if (row['created_at'], row['id']) > (created_at, request_id)]
+        else:
+            matches = [row for row in rows if row['created_at'] >= params['created_at'][len('gte.'):]]
+        return SimpleNamespace(data=sorted(matches, key=lambda row: (row['created_at'], row['id']))[:int(params['limit'])])
+
+    supa_db._execute = execute
+    requests = await supa_db.get_pending_requests('2026-01-01T00:00:01+00:00', page_size=3)
+    assert [request['id'] for request in requests] == [row['id'] for row in rows]
@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from src.locker.async_locker import AsyncLocker
+from src.locker.board_map import BoardMap, BoardSlot
+from main import resolve_board_map
+
+
+def test_parse_and_locate():
+    """
+    보드 맵 파싱 및 전역 번호 위치 확인 테스트
+    Test for parsing a board map and locating global locker numbers
+    """
+    board_map = BoardMap.parse("/dev/ttyUSB0=0,1; /dev/ttyUSB1")
+
+    assert len(board_map) == 48
+    assert board_map.ports() == ["/dev/ttyUSB0", "/dev/ttyUSB1"]
+    assert board_map.locate(1) == BoardSlot("/dev/ttyUSB0", 0, 0)
+    assert board_map.locate(17) == BoardSlot("/dev/ttyUSB0", 1, 0)
+    assert board_map.locate(48) == BoardSlot("/dev/ttyUSB1", 0, 15)
+    assert board_map.locate(49) is None
+    assert board_map.numbers("/dev/ttyUSB1") == list(range(33, 49))
+
+
+@pytest.mark.parametrize("spec", ["", "/dev/ttyUSB0=16", "/dev/ttyUSB0=x", "/dev/ttyUSB0=1,1"])
+def test_invalid_board_map(spec):
+    """
+    잘못된 보드 맵 설정 테스트
+    Test for invalid board map specifications
+    """
+    with pytest.raises(ValueError):
+        BoardMap.parse(spec)
+
+
+async def test_status_fans_out_across_boards():
+    """
+    여러 보드의 상태를 하나의 스냅샷으로 병합하는지 테스트
+    Test that status reads of all boards merge into one snapshot
+    """
+    locker = AsyncLocker('sim://bank', board_map=BoardMap.parse("sim://bank=0,1"))
+    try:
+        sim = locker.lockers['sim://bank'].ser
+        sim.door(1, 3).locked = False
+        states = await locker.get_all_locker_states()
+        assert len(states) == 32
+        assert states[20] is False
+        assert states[4] is True
+
+        assert await locker.open(30)
+        # 30번 = 보드 1, 채널 13 / locker 30 is board 1, channel 13
+        assert not sim.door(1, 13).is_locked(time.monotonic())
+        assert not await locker.open(33)
+    finally:
+        locker.close()
+
+
+async def test_ports_are_polled_in_parallel():
+    """
+    여러 포트의 상태 확인이 병렬로 처리되는지 테스트
+    Test that status reads of several ports run in parallel
+    """
+    locker = AsyncLocker('sim://a,sim://b')
+    try:
+        transactions = {}
+        for port, port_locker in locker.lockers.items():
+            port_locker.ser.latency = 0.1
+
+            def timed(packet, expect_response=False, transact=port_locker.transact, port=port):
+                started = time.monotonic()
+                try:
+                    return transact(packet, expect_response)
+                finally:
+                    transactions.setdefault(port, []).append((started, time.monotonic()))
+            port_locker.transact = timed
+        locker.lockers['sim://b'].ser.door_for(3).locked = False
+
+        states = await locker.get_all_locker_states()
+
+        assert len(states) == 32
+        assert states[19] is False
+        # 두 포트의 느린 읽기 구간이 겹쳐야 함 / the slow reads of both ports overlap in time
+        (start_a, end_a), (start_b, end_b) = transactions['sim://a'][0], transactions['sim://b'][0]
+        assert max(start_a, start_b) < min(end_a, end_b)
+
+        assert await locker.open_many([2, 18]) == {2: True, 18: True}
+        now = time.monotonic()
+        assert not locker.lockers['sim://a'].ser.door_for(2).is_locked(now)
+        assert not locker.lockers['sim://b'].ser.door_for(2).is_locked(now)
+    finally:
+        locker.close()
+
+
+def test_resolve_board_map():
+    """
+    --port 와 --board-map 조합 처리 테스트
+    Test how --port and --board-map combine
+    """
+    assert resolve_board_map(None, None).ports() == ["/dev/ttyUSB0"]
+    assert resolve_board_map("PORT_A,PORT_B", None).ports() == ["PORT_A", "PORT_B"]
+    assert len(resolve_board_map(None, "PORT_A=0,1")) == 32
+    assert len(resolve_board_map("PORT_A", "PORT_A=0,1")) == 32
+
+    with pytest.raises(Exception, match="does not match"):
+        resolve_board_map("PORT_B", "PORT_A=0,1")
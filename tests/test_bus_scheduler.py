@@ -0,0 +1,57 @@
+import asyncio
+import threading
+
+import pytest
+
+from src.locker.bus_scheduler import BusScheduler
+from src.locker.constants import BusPriority
+
+
+@pytest.fixture
+def bus():
+    """
+    사물함 없이 동작하는 버스 스케줄러 픽스처
+    Fixture providing a bus scheduler without a locker attached
+    """
+    scheduler = BusScheduler(locker=None)
+    yield scheduler
+    scheduler.close()
+
+
+async def test_unlock_jumps_ahead_of_polls(bus):
+    """
+    잠금 해제 명령이 대기 중인 상태 확인보다 먼저 처리되는지 테스트
+    Test that an unlock command runs before already queued status polls
+    """
+    gate = threading.Event()
+    order = []
+
+    busy = bus.submit(BusPriority.POLL, gate.wait)
+    polls = [bus.submit(BusPriority.POLL, order.append, f"poll-{i}") for i in range(3)]
+    unlock = bus.submit(BusPriority.UNLOCK, order.append, "unlock")
+
+    gate.set()
+    await asyncio.gather(busy, unlock, *polls)
+    assert order == ["unlock", "poll-0", "poll-1", "poll-2"]
+
+
+async def test_errors_are_returned_to_the_caller(bus):
+    """
+    명령 실행 중 발생한 예외가 호출자에게 전달되는지 테스트
+    Test that an exception raised on the bus thread reaches the awaiting caller
+    """
+    def fail():
+        raise ValueError("bus error")
+
+    with pytest.raises(ValueError, match="bus error"):
+        await bus.submit(BusPriority.POLL, fail)
+
+
+async def test_submit_after_close_fails(bus):
+    """
+    종료된 스케줄러에 명령 제출 시 실패 테스트
+    Test that submitting to a closed scheduler fails
+    """
+    bus.close()
+    with pytest.raises(RuntimeError):
+        bus.submit(BusPriority.POLL, print)
@@ -0,0 +1,25 @@
+from benchmarks.e2e_latency import StageTimer, parse_arguments, run
+
+
+def test_percentile_nearest_rank():
+    """
+    백분위수 계산 테스트
+    Test nearest-rank percentiles
+    """
+    ordered = [i / 1000 for i in range(1, 101)]
+    assert StageTimer.percentile(ordered, 50) == 0.05
+    assert StageTimer.percentile(ordered, 99) == 0.099
+    assert StageTimer.percentile([0.5], 95) == 0.5
+
+
+async def test_benchmark_smoke_run():
+    """
+    시뮬레이터와 대체 REST API 로 벤치마크가 끝까지 실행되는지 테스트
+    Test that the benchmark runs end to end on the simulator and stand-in REST API
+    """
+    result = await run(parse_arguments(['--requests', '8', '--rate', '200', '--rtt', '0.001']))
+
+    assert result['outcomes'] == {'success': 8}
+    for stage in ('db_lookup', 'serial_unlock', 'verification', 'status_update', 'free_storage', 'total'):
+        assert result['stages'][stage]['count'] == 8
+        assert result['stages'][stage]['p50_ms'] <= result['stages'][stage]['p99_ms']
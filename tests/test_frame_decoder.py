@@ -0,0 +1,101 @@
+import time
+
+import pytest
+
+from src.locker.async_locker import AsyncLocker
+from src.locker.constants import LockerCommand, PacketByte
+from src.locker.frame_decoder import FrameDecoder
+
+
+def make_frame(low=0xFF, high=0xFF, address=PacketByte.DEFAULT_ADDR.value):
+    frame = bytearray([PacketByte.STX.value, address, LockerCommand.STATUS.value,
+                       low, high, PacketByte.ETX.value, 0x00, 0x00])
+    frame.append(FrameDecoder.checksum(frame))
+    return bytes(frame)
+
+
+def test_frame_split_across_reads():
+    """
+    여러 번에 나뉘어 도착한 프레임 디코딩 테스트
+    Test for decoding a frame that arrives in several chunks
+    """
+    decoder = FrameDecoder()
+    frame = make_frame()
+    assert decoder.feed(frame[:4]) == []
+    assert decoder.feed(frame[4:]) == [frame]
+
+
+def test_garbage_is_skipped():
+    """
+    프레임 앞의 잡음 바이트 제거 테스트
+    Test that noise before a frame is discarded
+    """
+    decoder = FrameDecoder()
+    frame = make_frame(low=0x0F)
+    assert decoder.feed(b'\xff\x00\x13' + frame) == [frame]
+    assert decoder.discarded_bytes == 3
+    assert decoder.bad_frames == 0
+
+
+@pytest.mark.parametrize("index, value", [(5, 0x00), (8, 0x00)])
+def test_bad_frame_resyncs_on_next_frame(index, value):
+    """
+    ETX 또는 체크섬 오류 프레임을 버리고 다음 프레임으로 복구하는지 테스트
+    Test that a frame with a bad ETX or checksum is dropped and the next frame recovers
+    """
+    decoder = FrameDecoder()
+    corrupted = bytearray(make_frame())
+    corrupted[index] = value
+    frame = make_frame(high=0x01)
+
+    assert decoder.feed(bytes(corrupted) + frame) == [frame]
+    assert decoder.bad_frames == 1
+
+
+def test_dropped_byte_costs_one_frame():
+    """
+    바이트 손실 시 한 프레임만 손실되는지 테스트
+    Test that a dropped byte costs a single frame
+    """
+    decoder = FrameDecoder()
+    first, second = make_frame(low=0x01), make_frame(low=0x02)
+    assert decoder.feed(first[:3] + first[4:] + second) == [second]
+
+
+async def test_locker_reads_through_line_noise():
+    """
+    잡음이 있는 회선에서도 상태 확인이 성공하는지 테스트
+    Test that a status read succeeds on a noisy line
+    """
+    port = 'sim://noisy?latency=0.001&noise=1&seed=3'
+    locker = AsyncLocker(port)
+    try:
+        locker.lockers[port].ser.door_for(7).locked = False
+        states = await locker.get_all_locker_states()
+        assert states[7] is False
+        assert locker.lockers[port].get_cached_locker_states() is not None
+    finally:
+        locker.close()
+
+
+async def test_corrupted_reply_fails_fast():
+    """
+    손상된 응답이 타임아웃까지 기다리지 않고 실패하는지 테스트
+    Test that a corrupted reply fails without waiting for the full timeout
+    """
+    port = 'sim://corrupt?latency=0.001'
+    locker = AsyncLocker(port)
+    try:
+        sim = locker.lockers[port].ser
+        sim.timeout = 0.5
+        send = sim._send
+        # 체크섬 바이트를 깨뜨려 응답 / reply with a broken checksum byte
+        sim._send = lambda reply, ready_at: send(reply[:-1] + bytes([reply[-1] ^ 0xFF]), ready_at)
+
+        started = time.monotonic()
+        states = await locker.get_all_locker_states()
+        assert len(states) == 0
+        assert states.get(1) is None
+        assert time.monotonic() - started < 0.5
+    finally:
+        locker.close()
@@ -1,19 +1,12 @@
-import pytest
-from src.locker import Locker, LockerException
-from src.locker.logger_config import setup_logger
+import time
 
-# 사물함 시리얼 포트 설정
-# Serial port configuration for locker
-LOCKER_PORT = 'COM6'
+import pytest
 
+from src.locker.locker import Locker
 
-@pytest.fixture(autouse=True)
-def setup_logging():
-    """
-    로깅 설정을 초기화하는 픽스처
-    Fixture to initialize logging configuration
-    """
-    setup_logger()
+# 시뮬레이터 사물함 버스 포트 (실제 하드웨어 불필요)
+# Simulated locker bus port, no hardware required
+LOCKER_PORT = 'sim://test?latency=0.001&unlock_delay=0.005&seed=1'
 
 
 @pytest.fixture
@@ -23,28 +16,29 @@ def locker():
     Fixture to create and manage locker object for testing
     """
     locker = Locker(LOCKER_PORT)
+    locker.ser.timeout = 0.1
     yield locker
     locker.close()
 
 
-def test_connection_success():
+def test_connection_success(locker):
     """
     시리얼 포트 연결 성공 테스트
     Test for successful serial port connection
     """
-    locker = Locker(LOCKER_PORT)
     assert locker.ser is not None
     assert locker.ser.port == LOCKER_PORT
-    locker.close()
+    assert locker.ser.is_open
 
 
-def test_connection_failure():
+@pytest.mark.parametrize("port", ['/dev/nonexistent-locker-port', 'sim://test?unknown=1', 'nosuch://port'])
+def test_connection_failure(port):
     """
     잘못된 포트로 연결 실패 테스트
     Test for connection failure with invalid port
     """
-    with pytest.raises(LockerException, match="포트 연결 실패"):
-        Locker('INVALID_PORT')
+    with pytest.raises(Exception, match="Port connection failed"):
+        Locker(port)
 
 
 def test_close_connection(locker):
@@ -66,9 +60,8 @@ def test_status_check(locker, locker_number: int):
         locker_number: 테스트할 사물함 번호 (1-16)
                       Locker number to test (1-16)
     """
-    status = locker.is_locked(locker_number)
-    assert isinstance(status, bool)
-    print(f"Locker {locker_number} status: {'Locked' if status else 'Unlocked'}")
+    locker.ser.door_for(locker_number).locked = locker_number % 2 == 0
+    assert locker.is_locked(locker_number) is (locker_number % 2 == 0)
 
 
 @pytest.mark.parametrize("invalid_number", [-1, 0, 17, 100])
@@ -81,8 +74,9 @@ def test_invalid_locker_number(locker, invalid_number):
         invalid_number: 테스트할 잘못된 사물함 번호
                        Invalid locker number to test
     """
-    with pytest.raises(LockerException, match="잘못된 사물함 번호"):
-        locker.is_locked(invalid_number)
+    assert locker.is_locked(invalid_number)
+    assert not locker.open(invalid_number)
+    assert locker.ser.stats['frames'] == 0
 
 
 def test_open_locker(locker):
@@ -90,16 +84,10 @@ def test_open_locker(locker):
     단일 사물함 열기 테스트
     Test for opening a single locker
     """
-    locker_number = 1
-    initial_status = locker.is_locked(locker_number)
-    print(f"Initial status of locker {locker_number}: {'Locked' if initial_status else 'Unlocked'}")
-
-    if initial_status:
-        result = locker.open(locker_number)
-        assert result
-        final_status = locker.is_locked(locker_number)
-        assert not final_status
-        print(f"Locker {locker_number} opened successfully")
+    assert locker.is_locked(1)
+    assert locker.open(1)
+    assert not locker.is_locked(1)
+    assert locker.ser.stats['unlocks'] == 1
 
 
 def test_open_already_unlocked(locker):
@@ -107,11 +95,9 @@ def test_open_already_unlocked(locker):
     이미 열린 사물함 열기 시도 테스트
     Test for attempting to open an already unlocked locker
     """
-    locker_number = 1
-    if not locker.is_locked(locker_number):
-        result = locker.open(locker_number)
-        assert result
-        print(f"Locker {locker_number} was already unlocked")
+    locker.ser.door_for(1).locked = False
+    assert locker.open(1)
+    assert locker.ser.stats['unlocks'] == 0
 
 
 def test_open_all(locker):
@@ -119,17 +105,61 @@ def test_open_all(locker):
     전체 사물함 열기 테스트
     Test for opening all lockers
     """
-    # 전체 열기 시도
-    # Attempt to open all lockers
-    result = locker.open_all()
-    assert isinstance(result, bool)
+    assert locker.open_all()
+    assert not any(locker.get_all_locker_states().values())
+
+
+def test_jammed_latch_fails_to_open(locker):
+    """
+    잠금장치가 걸린 경우 열기 실패로 보고되는지 테스트
+    Test that a jammed latch is reported as a failed unlock
+    """
+    locker.ser.jam = 1.0
+    assert not locker.open(1)
+    assert locker.is_locked(1)
 
-    # 전체 상태 확인
-    # Check status of all lockers
-    statuses = []
-    for i in range(1, 17):
-        status = locker.is_locked(i)
-        statuses.append(status)
-        print(f"Locker {i} status after open_all: {'Locked' if status else 'Unlocked'}")
 
-    print(f"All locker statuses: {statuses}")
+def test_door_closes_again(locker):
+    """
+    자동 닫힘 설정 시 문이 다시 잠기는지 테스트
+    Test that a door relocks after the auto close time
+    """
+    locker.ser.auto_close = 0.05
+    assert locker.open(1)
+    time.sleep(0.1)
+    assert locker.is_locked(1)
+
+
+def test_reads_through_noise_and_loss():
+    """
+    잡음과 바이트 손실이 있는 회선에서 읽기 결과가 정확하거나 알 수 없음으로 처리되는지 테스트
+    Test that reads on a noisy, lossy line are either correct or unknown, never wrong
+    """
+    locker = Locker('sim://noisy?latency=0.001&noise=0.5&loss=0.02&seed=7')
+    locker.ser.timeout = 0.05
+    try:
+        locker.ser.door_for(5).locked = False
+        readable = 0
+        for _ in range(50):
+            states = locker.get_all_locker_states()
+            if 5 in states:
+                readable += 1
+                assert states[5] is False
+                assert states[4] is True
+        assert readable > 25
+    finally:
+        locker.close()
+
+
+def test_absent_board_stays_silent():
+    """
+    존재하지 않는 보드 주소는 응답하지 않아 상태를 알 수 없는지 테스트
+    Test that a board missing from the bus does not answer and its lockers stay unknown
+    """
+    locker = Locker('sim://bus?boards=1')
+    locker.ser.timeout = 0.05
+    try:
+        assert len(locker.get_all_locker_states()) == 0
+        assert locker.ser.stats['ignored_frames'] == 1
+    finally:
+        locker.close()
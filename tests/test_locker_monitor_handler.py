@@ -0,0 +1,148 @@
+from src.handler.locker_moniter_handler import LockerMonitorHandler
+from src.locker.locker_states import LockerStates
+
+
+class FakeLocker:
+    def add_unlock_listener(self, callback):
+        self.unlock_listener = callback
+
+
+class FakeSupaDB:
+    def __init__(self):
+        self.queued = []
+
+    def queue_storage_status(self, storage_id, is_locked):
+        self.queued.append((storage_id, is_locked))
+
+
+class FakeRealtimeService:
+    def __init__(self):
+        self.messages = []
+
+    async def broadcast(self, event, payload):
+        self.messages.append((event, payload))
+        return True
+
+
+async def test_state_changes_are_broadcast():
+    """
+    상태 변경 시 변경분만 브로드캐스트되는지 테스트
+    Test that only actual state changes are broadcast to clients
+    """
+    realtime_service = FakeRealtimeService()
+    handler = LockerMonitorHandler(FakeLocker(), FakeSupaDB(), realtime_service=realtime_service)
+    storages = [{'id': 's1', 'number': 1}, {'id': 's2', 'number': 2}]
+
+    await handler.sync_storage_states(storages, LockerStates.from_dict({1: True, 2: True}))
+    assert realtime_service.messages == []
+
+    await handler.apply_locker_states(LockerStates.from_dict({1: True, 2: False}))
+    assert len(realtime_service.messages) == 1
+    event, payload = realtime_service.messages[0]
+    assert event == LockerMonitorHandler.STATE_EVENT
+    assert [(c['storage_id'], c['is_locked']) for c in payload['changes']] == [('s2', False)]
+    assert isinstance(payload['changes'][0]['timestamp'], int)
+    assert handler.supa_db.queued[-1] == ('s2', False)
+
+
+
+class FakeSyncLocker(FakeLocker):
+    def __init__(self, states):
+        self.states = states
+
+    async def get_all_locker_states(self):
+        return self.states
+
+
+class FakeSyncSupaDB(FakeSupaDB):
+    def __init__(self, storages):
+        super().__init__()
+        self.storages = storages
+        self.since = []
+
+    async def get_storages_changed_since(self, since=None):
+        self.since.append(since)
+        return [s for s in self.storages if since is None or s['updated_at'] >= since]
+
+
+async def test_incremental_sync_fetches_only_changed_storages():
+    """
+    증분 동기화 시 워터마크 이후 변경된 보관함만 조회 및 반영하는지 테스트
+    Test that incremental sync only fetches and applies storages changed since the watermark
+    """
+    supa_db = FakeSyncSupaDB([
+        {'id': 's1', 'number': 1, 'updated_at': '2026-01-01T00:00:01+00:00'},
+        {'id': 's2', 'number': 2, 'updated_at': '2026-01-01T00:00:02+00:00'},
+    ])
+    handler = LockerMonitorHandler(FakeSyncLocker(LockerStates.from_dict({1: True, 2: False, 3: True})), supa_db)
+    assert await handler.initialize_states()
+    assert handler.sync_watermark == '2026-01-01T00:00:02+00:00'
+
+    supa_db.storages.append({'id': 's3', 'number': 3, 'updated_at': '2026-01-01T00:00:03+00:00'})
+    supa_db.storages[0] = {'id': 's1', 'number': 1, 'updated_at': '2026-01-01T00:00:04+00:00'}
+    supa_db.queued.clear()
+    await handler.incremental_sync()
+
+    assert supa_db.since[-1] == '2026-01-01T00:00:02+00:00'
+    assert supa_db.queued == [('s3', True)]
+    assert handler.storage_states['s3'].number == 3
+    assert handler.sync_watermark == '2026-01-01T00:00:04+00:00'
+
+
+async def test_poll_only_touches_flipped_lockers():
+    """
+    폴링 시 상태가 바뀐 사물함만 반영되고 번호 변경 시 이전 번호 추적이 해제되는지 테스트
+    Test that a poll only records flipped lockers and a renumbered storage leaves its old number
+    """
+    handler = LockerMonitorHandler(FakeLocker(), FakeSupaDB())
+    storages = [{'id': 's1', 'number': 1}, {'id': 's2', 'number': 2}]
+    await handler.sync_storage_states(storages, LockerStates.from_dict({1: True, 2: True, 3: False}))
+    handler.supa_db.queued.clear()
+
+    await handler.apply_locker_states(LockerStates.from_dict({1: True, 2: True, 3: True}))
+    assert handler.supa_db.queued == []
+
+    await handler.sync_storage_states([{'id': 's2', 'number': 3}], LockerStates.from_dict({2: True, 3: False}))
+    assert 2 not in handler.known_states
+    assert handler.storages_by_number[3][0].id == 's2'
+
+    await handler.apply_locker_states(LockerStates.from_dict({1: False, 2: False, 3: False}))
+    assert handler.supa_db.queued == [('s2', False), ('s1', False)]
+
+
+async def test_unknown_reading_holds_last_known_state():
+    """
+    상태를 읽지 못한 경우 마지막 상태를 유지하고 DB 기록이 발생하지 않는지 테스트
+    Test that an unknown reading holds the last known state and causes no writes
+    """
+    handler = LockerMonitorHandler(FakeLocker(), FakeSupaDB())
+    storages = [{'id': 's1', 'number': 1}, {'id': 's2', 'number': 2}, {'id': 's17', 'number': 17}]
+    await handler.sync_storage_states(storages, LockerStates.from_board(1, 0b01))
+    assert handler.supa_db.queued == [('s1', True), ('s2', False)]
+    assert handler.storage_states['s17'].is_locked is None
+    handler.supa_db.queued.clear()
+
+    await handler.apply_locker_states(LockerStates())
+    assert handler.supa_db.queued == []
+    assert handler.storage_states['s2'].is_locked is False
+    assert handler.unknown_mask == LockerStates.bit(1) | LockerStates.bit(2) | LockerStates.bit(17)
+
+    reading = LockerStates.from_board(1, 0b01)
+    reading.update(LockerStates.from_board(17, 0b1))
+    await handler.apply_locker_states(reading)
+    assert handler.supa_db.queued == [('s17', True)]
+    assert handler.unknown_mask == 0
+
+
+async def test_invalid_storage_numbers_are_skipped():
+    """
+    잘못된 사물함 번호를 가진 보관함은 건너뛰고 나머지는 동기화되는지 테스트
+    Test that storages with an invalid locker number are skipped and the rest still sync
+    """
+    handler = LockerMonitorHandler(FakeLocker(), FakeSupaDB())
+    storages = [{'id': 's0', 'number': 0}, {'id': 'sn', 'number': None}, {'id': 's3', 'number': '3'},
+                {'id': 's1', 'number': 1}]
+
+    assert await handler.sync_storage_states(storages, LockerStates.from_dict({1: False}))
+    assert list(handler.storage_states) == ['s1']
+    assert handler.supa_db.queued == [('s1', False)]
@@ -0,0 +1,209 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.handler.locker_open_requests_handler import LockerOpenRequestsHandler
+
+
+class FakeLocker:
+    def __init__(self, result=True):
+        self.result = result
+        self.opened = []
+
+    async def open(self, number):
+        self.opened.append(number)
+        return self.result
+
+
+class FakeSupaDB:
+    PRIVILEGED_ROLES = ('deliver', 'manager')
+
+    def __init__(self, context):
+        self.context = context
+        self.statuses = {}
+        self.freed = []
+        self.pending_requests = []
+        self.pending_since = []
+
+    async def get_open_request_context(self, request_id, storage_id, user_id):
+        return self.context
+
+    async def get_pending_requests(self, since):
+        self.pending_since.append(since)
+        return self.pending_requests
+
+    async def update_request_status(self, request_id, status):
+        if request_id in self.statuses:
+            return False
+        self.statuses[request_id] = status
+        return True
+
+    async def free_storage(self, storage_id):
+        self.freed.append(storage_id)
+
+
+class FakeRealtimeService:
+    def set_callback(self, callback):
+        self.callback = callback
+
+    def add_connect_listener(self, callback):
+        self.connect_listener = callback
+
+
+def make_record(request_id='r1', storage_id='s1', requested_by='u1', created_at='2026-01-01T00:00:00+00:00'):
+    return {'id': request_id, 'storage_id': storage_id, 'requested_by': requested_by, 'created_at': created_at}
+
+
+def ago(seconds: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=seconds)).isoformat()
+
+
+def make_payload(**kwargs):
+    return {'data': {'record': make_record(**kwargs)}}
+
+
+def make_handler(context, locker_result=True):
+    return LockerOpenRequestsHandler(FakeLocker(locker_result), FakeSupaDB(context), FakeRealtimeService())
+
+
+@pytest.mark.parametrize("context, status, opened", [
+    ({'number': 3, 'laundry_id': None, 'paid': None, 'role': 'manager'}, 'success', [3]),
+    ({'number': 3, 'laundry_id': 'l1', 'paid': True, 'role': 'user'}, 'success', [3]),
+    ({'number': 3, 'laundry_id': 'l1', 'paid': False, 'role': 'user'}, 'reject', []),
+    ({'number': 3, 'laundry_id': None, 'paid': None, 'role': 'user'}, 'failed', []),
+    ({'number': 3, 'laundry_id': 'l1', 'paid': True, 'role': None}, 'failed', []),
+    (None, 'failed', []),
+])
+async def test_authorization(context, status, opened):
+    """
+    요청자 권한 및 결제 여부에 따른 처리 결과 테스트
+    Test request outcome for each requester role and payment state
+    """
+    handler = make_handler(context)
+    await handler.handle_change(make_payload())
+
+    assert handler.supa_db.statuses == {'r1': status}
+    assert handler.locker.opened == opened
+    assert handler.supa_db.freed == (['s1'] if status == 'success' else [])
+
+
+async def test_unlock_failure_marks_request_failed():
+    """
+    잠금 해제 실패 시 요청이 실패 처리되는지 테스트
+    Test that a failed unlock marks the request as failed
+    """
+    handler = make_handler({'number': 3, 'laundry_id': None, 'paid': None, 'role': 'deliver'}, locker_result=False)
+    await handler.handle_change(make_payload())
+
+    assert handler.supa_db.statuses == {'r1': 'failed'}
+    assert handler.supa_db.freed == []
+
+
+async def test_dispatch_queues_request_for_handling():
+    """
+    실시간 요청이 디스패처를 통해 처리되는지 테스트
+    Test that a realtime payload is handled through the dispatcher
+    """
+    handler = make_handler({'number': 3, 'laundry_id': None, 'paid': None, 'role': 'manager'})
+    handler.dispatcher.start()
+    assert handler.dispatch(make_payload())
+    assert not handler.dispatch({'data': {}})
+    await handler.dispatcher.close()
+
+    assert handler.supa_db.statuses == {'r1': 'success'}
+
+
+async def test_catch_up_merges_pending_requests_and_skips_duplicates():
+    """
+    재연결 시 대기 중인 요청을 처리하고 중복은 건너뛰는지 테스트
+    Test that catch-up queues missed pending requests and skips ones already seen
+    """
+    start, first, second = ago(30), ago(20), ago(10)
+    handler = make_handler({'number': 3, 'laundry_id': None, 'paid': None, 'role': 'manager'})
+    handler.dispatcher.start()
+    assert handler.dispatch(make_payload(request_id='r1', created_at=first))
+    assert not handler.dispatch(make_payload(request_id='r1', created_at=first))
+
+    handler._catch_up_from = handler._parse_timestamp(start)
+    handler.supa_db.pending_requests = [
+        make_record(request_id='r1', created_at=first),
+        make_record(request_id='r2', storage_id='s2', created_at=second),
+    ]
+    await handler.realtime_service.connect_listener()
+    await handler.realtime_service.connect_listener()
+    await handler.dispatcher.close()
+
+    assert handler.supa_db.pending_since == [start, second]
+    assert handler.supa_db.statuses == {'r1': 'success', 'r2': 'success'}
+    assert handler.locker.opened == [3, 3]
+
+
+async def test_live_request_does_not_move_catch_up_cursor():
+    """
+    재연결 직후 실시간 요청이 먼저 도착해도 연결 공백 중의 요청을 놓치지 않는지 테스트
+    Test that a live request arriving before the reconnect catch-up does not skip requests from the gap
+    """
+    start = ago(30)
+    handler = make_handler({'number': 3, 'laundry_id': None, 'paid': None, 'role': 'manager'})
+    handler.dispatcher.start()
+    handler._catch_up_from = handler._parse_timestamp(start)
+    assert handler.dispatch(make_payload(request_id='live', created_at=ago(5)))
+
+    handler.supa_db.pending_requests = [
+        make_record(request_id='gap', storage_id='s2', created_at=ago(10)),
+    ]
+    await handler.realtime_service.connect_listener()
+    await handler.dispatcher.close()
+
+    assert handler.supa_db.pending_since == [start]
+    assert handler.supa_db.statuses == {'live': 'success', 'gap': 'success'}
+
+
+async def test_catch_up_never_reaches_back_past_max_age():
+    """
+    오래 실행된 후의 재연결에서도 최대 보존 시간보다 오래된 요청을 조회하지 않는지 테스트
+    Test that a catch-up long after startup never queries further back than CATCH_UP_MAX_AGE
+    """
+    handler = make_handler({'number': 3, 'laundry_id': None, 'paid': None, 'role': 'manager'})
+    handler._catch_up_from = handler._parse_timestamp(ago(2 * 24 * 3600))
+
+    before = datetime.now(timezone.utc)
+    await handler.realtime_service.connect_listener()
+    since = datetime.fromisoformat(handler.supa_db.pending_since[0])
+    assert since >= before - timedelta(seconds=handler.CATCH_UP_MAX_AGE)
+
+    # 시작 후 처음 연결해도 동일 / same for the first connect after startup
+    handler._catch_up_from = None
+    await handler.realtime_service.connect_listener()
+    since = datetime.fromisoformat(handler.supa_db.pending_since[1])
+    assert since >= before - timedelta(seconds=handler.CATCH_UP_MAX_AGE)
+
+
+async def test_finalized_request_is_not_freed_again():
+    """
+    이미 처리된 요청은 상태 변경 및 보관함 해제를 반복하지 않는지 테스트
+    Test that an already finalized request does not overwrite its status or free the storage again
+    """
+    handler = make_handler({'number': 3, 'laundry_id': None, 'paid': None, 'role': 'manager'})
+    handler.supa_db.statuses['r1'] = 'success'
+    await handler.handle_change(make_payload())
+
+    assert handler.supa_db.statuses == {'r1': 'success'}
+    assert handler.supa_db.freed == []
+
+
+async def test_redelivered_request_costs_nothing():
+    """
+    재전송된 요청이 잠금 해제나 DB 기록 없이 무시되는지 테스트
+    Test that a redelivered request triggers no unlock and no writes
+    """
+    handler = make_handler({'number': 3, 'laundry_id': None, 'paid': None, 'role': 'manager'})
+    handler.dispatcher.start()
+    assert handler.dispatch(make_payload())
+    await asyncio.sleep(0.01)
+    assert not handler.dispatch(make_payload())
+    await handler.dispatcher.close()
+
+    assert handler.locker.opened == [3]
+    assert handler.supa_db.freed == ['s1']
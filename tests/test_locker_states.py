@@ -0,0 +1,33 @@
+from src.locker.locker_states import LockerStates
+
+
+def test_board_status_word_maps_to_locker_numbers():
+    """
+    보드 상태 워드가 전역 사물함 번호로 변환되는지 테스트
+    Test that a board status word maps onto global locker numbers
+    """
+    states = LockerStates.from_board(17, 0b1000_0000_0000_0101)
+    assert len(states) == 16
+    assert states[17] is True
+    assert states[18] is False
+    assert states[19] is True
+    assert states[32] is True
+    assert 16 not in states
+    assert states.get(33, 'unknown') == 'unknown'
+
+
+def test_update_and_changed():
+    """
+    판독 결과 병합 및 XOR 비교로 변경된 사물함만 찾는지 테스트
+    Test merging readings and finding flipped lockers with an XOR diff
+    """
+    states = LockerStates.from_board(1, 0xFFFF)
+    states.update(LockerStates.from_board(17, 0x0000))
+    assert len(states) == 32
+
+    previous = states.copy()
+    states.set(3, False)
+    states.set(20, True)
+    states.set(40, True)
+    assert list(LockerStates.numbers(states.changed(previous))) == [3, 20]
+    assert states == {**dict(previous.items()), 3: False, 20: True, 40: True}
@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from logging.handlers import QueueHandler
+
+import pytest
+
+from src.utils.logger import SUBSYSTEMS, KSTFormatter, RepeatedMessageFilter, cleanup_logger, parse_subsystem_levels, setup_logger
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    """
+    로거 설정 후 루트 로거의 레벨과 핸들러를 복원하는 픽스처
+    Fixture that restores the root logger level and handlers after setup_logger
+    """
+    root = logging.getLogger()
+    level, handlers = root.level, root.handlers[:]
+    yield tmp_path
+    cleanup_logger()
+    root.setLevel(level)
+    for name in SUBSYSTEMS:
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    for handler in handlers:
+        root.addHandler(handler)
+
+
+def read(path) -> str:
+    return path.read_text(encoding='utf-8') if path.exists() else ''
+
+
+def test_only_queue_handler_on_root(log_dir):
+    """
+    루트 로거에는 큐 핸들러만 있고 파일 쓰기는 별도 스레드에서 수행되는지 테스트
+    Test that the root logger only holds a QueueHandler and files are written on another thread
+    """
+    setup_logger(str(log_dir), logging.DEBUG)
+    assert [type(handler) for handler in logging.getLogger().handlers] == [QueueHandler]
+    assert any(thread.name == 'log-writer' for thread in threading.enumerate())
+
+
+def test_records_reach_their_files(log_dir):
+    """
+    레벨별 로그가 각 파일에 기록되고 종료 시 모두 비워지는지 테스트
+    Test that each level lands in its own file and everything is drained on cleanup
+    """
+    setup_logger(str(log_dir), logging.DEBUG, flush_interval=60)
+    logging.debug("debug record")
+    logging.info("info record")
+    logging.error("error record")
+    logging.critical("critical record")
+    cleanup_logger()
+
+    assert "debug record" in read(log_dir / 'debug.log')
+    assert "info record" in read(log_dir / 'service.log')
+    assert "error record" not in read(log_dir / 'service.log')
+    assert "error record" in read(log_dir / 'error.log')
+    assert "critical record" in read(log_dir / 'critical.log')
+
+
+def test_flush_by_time_and_on_error(log_dir):
+    """
+    버퍼된 로그는 주기마다, 에러 로그는 즉시 파일에 기록되는지 테스트
+    Test that buffered records are flushed on the interval and errors right away
+    """
+    setup_logger(str(log_dir), logging.DEBUG, flush_interval=0.05)
+    logging.info("buffered record")
+    deadline = time.monotonic() + 2
+    while "buffered record" not in read(log_dir / 'service.log') and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "buffered record" in read(log_dir / 'service.log')
+
+    setup_logger(str(log_dir), logging.DEBUG, flush_interval=60)
+    logging.info("before error")
+    logging.error("urgent record")
+    deadline = time.monotonic() + 2
+    while "urgent record" not in read(log_dir / 'error.log') and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "urgent record" in read(log_dir / 'error.log')
+    assert "before error" in read(log_dir / 'service.log')
+
+
+def make_record(message, *args, level=logging.ERROR, created=None):
+    record = logging.LogRecord('locker', level, __file__, 0, message, args, None)
+    if created is not None:
+        record.created = created
+    return record
+
+
+def test_repeated_messages_are_rate_limited():
+    """
+    동일한 오류 메시지는 주기마다 한 번만 기록되고 반복 횟수가 표시되는지 테스트
+    Test that identical errors pass once per interval and report the repeat count
+    """
+    repeat_filter = RepeatedMessageFilter(interval=0.05)
+    assert repeat_filter.filter(make_record("Board %s timeout", 3))
+    assert not repeat_filter.filter(make_record("Board %s timeout", 3))
+    assert not repeat_filter.filter(make_record("Board %s timeout", 3))
+    assert repeat_filter.filter(make_record("Board %s timeout", 4))
+    assert repeat_filter.filter(make_record("Board %s timeout", 3, level=logging.INFO))
+
+    time.sleep(0.06)
+    record = make_record("Board %s timeout", 3)
+    assert repeat_filter.filter(record)
+    assert record.getMessage().startswith("Board 3 timeout (repeated 2 more times")
+
+
+def test_kst_time_is_cached_per_second():
+    """
+    KST 시간 문자열이 같은 초 안에서는 재사용되는지 테스트
+    Test that the KST timestamp text is reused within the same second
+    """
+    formatter = KSTFormatter('[%(asctime)s] %(message)s')
+    first = formatter.formatTime(make_record("a", created=0.2))
+    assert first == '1970-01-01 09:00:00'
+    assert formatter.formatTime(make_record("b", created=0.9)) is first
+    assert formatter.formatTime(make_record("c", created=1.0)) == '1970-01-01 09:00:01'
+    assert formatter.formatTime(make_record("d", created=0.5), '%H:%M') == '09:00'
+
+
+def test_subsystem_levels(log_dir):
+    """
+    하위 시스템별 로깅 레벨이 적용되고 비활성 레벨의 인자는 문자열로 변환되지 않는지 테스트
+    Test that subsystem levels apply and arguments of disabled records are never formatted
+    """
+    class Expensive:
+        formatted = 0
+
+        def __str__(self):
+            Expensive.formatted += 1
+            return "expensive"
+
+    setup_logger(str(log_dir), logging.INFO,
+                 subsystem_levels=parse_subsystem_levels("locker=WARNING,supa_realtime=DEBUG"))
+    logging.getLogger('locker').info("locker info %s", Expensive())
+    logging.getLogger('supa_realtime').debug("realtime debug %s", Expensive())
+    # 외부 realtime 패키지의 로거에는 영향이 없어야 함 / the realtime library's own loggers are unaffected
+    assert logging.getLogger('realtime._async.client').getEffectiveLevel() == logging.INFO
+    cleanup_logger()
+
+    assert Expensive.formatted == 1
+    assert "locker info" not in read(log_dir / 'service.log')
+    assert "realtime debug expensive" in read(log_dir / 'debug.log')
+
+    with pytest.raises(ValueError):
+        parse_subsystem_levels("serial=DEBUG")
+    with pytest.raises(ValueError):
+        parse_subsystem_levels("realtime=DEBUG")
+    assert parse_subsystem_levels("metrics=ERROR") == {'metrics': logging.ERROR}
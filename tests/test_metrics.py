@@ -0,0 +1,74 @@
+import asyncio
+
+from src.locker.locker import Locker
+from src.utils.metrics import REGISTRY, Counter, Gauge, Histogram, MetricsRegistry, MetricsServer
+
+
+def test_text_exposition():
+    """
+    카운터, 게이지, 히스토그램이 Prometheus 텍스트 형식으로 출력되는지 테스트
+    Test that counters, gauges and histograms render in the Prometheus text format
+    """
+    registry = MetricsRegistry()
+    requests = Counter('requests_total', 'Requests', ['status'], registry=registry)
+    depth = Gauge('queue_depth', 'Queue depth', registry=registry)
+    latency = Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0), registry=registry)
+
+    requests.labels('success').inc()
+    requests.labels(status='success').inc(2)
+    depth.set_function(lambda: 7)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{status="success"} 3.0' in text
+    assert 'queue_depth 7.0' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert 'latency_seconds_count 3' in text
+
+
+async def test_metrics_server_serves_registry():
+    """
+    /metrics 요청에 메트릭이 응답되고 다른 경로는 404 인지 테스트
+    Test that /metrics serves the registry and other paths return 404
+    """
+    registry = MetricsRegistry()
+    Counter('hits_total', 'Hits', registry=registry).inc()
+    server = MetricsServer(0, registry=registry)
+    await server.start()
+    try:
+        async def get(path):
+            reader, writer = await asyncio.open_connection('127.0.0.1', server.port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+            response = await reader.read()
+            writer.close()
+            return response.decode()
+
+        response = await get('/metrics')
+        assert response.startswith('HTTP/1.1 200 OK')
+        assert 'hits_total 1.0' in response
+        assert (await get('/')).startswith('HTTP/1.1 404')
+    finally:
+        await server.close()
+
+
+def test_locker_counts_serial_timeouts():
+    """
+    응답 없는 보드에 대해 시리얼 타임아웃과 전송 시간이 기록되는지 테스트
+    Test that a silent board is counted as a serial timeout and its transaction is timed
+    """
+    port = 'sim://metrics?boards=1'
+    locker = Locker(port)
+    locker.ser.timeout = 0.02
+    try:
+        locker.get_all_locker_states()
+    finally:
+        locker.close()
+
+    text = REGISTRY.render()
+    assert f'locker_serial_timeouts_total{{port="{port}"}} 1.0' in text
+    assert f'locker_serial_transaction_seconds_count{{port="{port}",command="status"}} 1' in text
@@ -0,0 +1,54 @@
+import asyncio
+
+from src.supa_realtime.realtime_service import RealtimeService
+
+
+def test_reconnect_delay_is_bounded():
+    """
+    재연결 대기 시간이 즉시 재시도 후 상한 내에서 증가하는지 테스트
+    Test that the reconnect delay starts immediate and stays within the back-off ceiling
+    """
+    service = RealtimeService("http://localhost", "jwt")
+    assert service._reconnect_delay() == 0
+
+    for attempts in range(1, 20):
+        service._reconnect_attempts = attempts
+        ceiling = min(service.RECONNECT_MAX_DELAY, service.RECONNECT_BASE_DELAY * 2 ** (attempts - 1))
+        assert 0 <= service._reconnect_delay() <= ceiling
+
+
+async def test_flapping_connection_backs_off_and_notifies(monkeypatch):
+    """
+    연결이 바로 끊기는 경우 재연결 시도가 누적되고 매 연결마다 리스너가 호출되는지 테스트
+    Test that a connection dropping right away keeps backing off and notifies listeners on every connect
+    """
+    service = RealtimeService("http://localhost", "jwt")
+    service.RECONNECT_BASE_DELAY = 0.001
+    connects = []
+    service.add_connect_listener(lambda: connects.append(service._reconnect_attempts))
+
+    class DeadSocket:
+        is_connected = False
+
+    async def establish_connection():
+        service._socket = DeadSocket()
+        return True
+
+    async def listen():
+        if len(connects) >= 3:
+            service._is_running = False
+
+    monkeypatch.setattr(service, "establish_connection", establish_connection)
+    monkeypatch.setattr(service, "_listen", listen)
+    await asyncio.wait_for(service.start_listening(), timeout=1)
+
+    assert connects == [0, 1, 2]
+
+
+async def test_broadcast_requires_joined_channel():
+    """
+    브로드캐스트 채널 미연결 시 전송하지 않는지 테스트
+    Test that broadcast is skipped while the channel is not joined
+    """
+    service = RealtimeService("http://localhost", "jwt")
+    assert not await service.broadcast("storage_state", {'changes': []})
@@ -0,0 +1,26 @@
+import time
+
+from src.handler.request_dedup import RequestDedupIndex
+
+
+def test_claim_within_window():
+    """
+    시간 창 안에서 같은 요청이 한 번만 허용되는지 테스트
+    Test that a request id is claimed only once within the window
+    """
+    index = RequestDedupIndex(window=60)
+    assert index.claim('r1')
+    assert not index.claim('r1')
+    assert 'r1' in index
+    assert 'r2' not in index
+
+
+def test_claim_after_window_expires():
+    """
+    시간 창이 지나면 다시 허용되는지 테스트
+    Test that a request id can be claimed again once the window has passed
+    """
+    index = RequestDedupIndex(window=0.01)
+    assert index.claim('r1')
+    time.sleep(0.02)
+    assert index.claim('r1')
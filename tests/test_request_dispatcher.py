@@ -0,0 +1,103 @@
+import asyncio
+
+from src.handler.request_dispatcher import RequestDispatcher
+
+
+async def test_same_key_runs_in_order_and_keys_run_in_parallel():
+    """
+    같은 보관함 요청은 순서대로, 다른 보관함 요청은 병렬로 처리되는지 테스트
+    Test that items of one key run in order while different keys run in parallel
+    """
+    log = []
+    running = 0
+    peak = 0
+
+    async def handler(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        log.append(item)
+        running -= 1
+
+    dispatcher = RequestDispatcher(handler, max_workers=4)
+    dispatcher.start()
+    for item in ['a1', 'b1', 'a2', 'c1', 'a3']:
+        assert dispatcher.submit_nowait(item[0], item)
+    await dispatcher.close()
+
+    assert [item for item in log if item[0] == 'a'] == ['a1', 'a2', 'a3']
+    assert sorted(log) == ['a1', 'a2', 'a3', 'b1', 'c1']
+    assert peak == 3
+
+
+async def test_worker_pool_is_bounded():
+    """
+    동시 처리 수가 작업자 수로 제한되는지 테스트
+    Test that concurrency never exceeds max_workers
+    """
+    running = 0
+    peak = 0
+
+    async def handler(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    dispatcher = RequestDispatcher(handler, max_workers=2)
+    dispatcher.start()
+    for key in range(6):
+        dispatcher.submit_nowait(key, key)
+    await dispatcher.close()
+    assert peak == 2
+
+
+async def test_backpressure_and_closed_dispatcher():
+    """
+    대기열이 가득 차거나 종료된 경우 요청을 거부하는지 테스트
+    Test that submissions are refused when the queue is full or closed
+    """
+    release = asyncio.Event()
+
+    async def handler(item):
+        await release.wait()
+
+    dispatcher = RequestDispatcher(handler, max_workers=1, max_pending=2)
+    dispatcher.start()
+    assert dispatcher.submit_nowait('a', 1)
+    await asyncio.sleep(0)
+    assert dispatcher.submit_nowait('a', 2)
+    assert dispatcher.submit_nowait('b', 3)
+    assert not dispatcher.submit_nowait('c', 4)
+
+    waiter = asyncio.create_task(dispatcher.submit('c', 4))
+    await asyncio.sleep(0.01)
+    assert not waiter.done()
+
+    release.set()
+    assert await waiter
+    await dispatcher.close()
+    assert not dispatcher.submit_nowait('d', 5)
+    assert dispatcher.pending == 0 and dispatcher.in_flight == 0
+
+
+async def test_handler_errors_do_not_stop_workers():
+    """
+    처리 중 예외가 발생해도 다음 요청이 처리되는지 테스트
+    Test that a failing item is logged and later items still run
+    """
+    done = []
+
+    async def handler(item):
+        if item == 'bad':
+            raise ValueError("boom")
+        done.append(item)
+
+    dispatcher = RequestDispatcher(handler, max_workers=1)
+    dispatcher.start()
+    dispatcher.submit_nowait('a', 'bad')
+    dispatcher.submit_nowait('a', 'good')
+    await dispatcher.close()
+    assert done == ['good']
@@ -0,0 +1,70 @@
+import asyncio
+
+from src.supa_db.status_batcher import StorageStatusBatcher
+
+
+async def test_changes_are_coalesced_into_one_flush():
+    """
+    같은 보관함의 여러 변경이 마지막 값으로 합쳐져 한 번에 기록되는지 테스트
+    Test that repeated changes to a storage coalesce (last write wins) into one flush
+    """
+    flushed = []
+
+    async def flush(statuses):
+        flushed.append(dict(statuses))
+
+    batcher = StorageStatusBatcher(flush, flush_interval=0.01)
+    batcher.put('a', True)
+    batcher.put('b', False)
+    batcher.put('a', False)
+
+    task = asyncio.create_task(batcher.run())
+    await asyncio.sleep(0.05)
+    batcher.stop()
+    await task
+
+    assert flushed == [{'a': False, 'b': False}]
+
+
+async def test_failed_flush_is_retried_without_overwriting_newer_changes():
+    """
+    실패한 기록이 재시도되며 그 사이의 새 변경을 덮어쓰지 않는지 테스트
+    Test that a failed flush is re-queued without overwriting changes queued meanwhile
+    """
+    calls = []
+
+    async def flush(statuses):
+        calls.append(dict(statuses))
+        if len(calls) == 1:
+            batcher.put('a', True)
+            raise ConnectionError("network down")
+
+    batcher = StorageStatusBatcher(flush, flush_interval=0.01)
+    batcher.put('a', False)
+    batcher.put('b', False)
+
+    assert not await batcher.flush()
+    assert batcher.pending() == 2
+    assert await batcher.flush()
+    assert calls[-1] == {'a': True, 'b': False}
+    assert batcher.pending() == 0
+
+
+async def test_size_threshold_triggers_flush():
+    """
+    대기 건수가 임계값에 도달하면 즉시 기록되는지 테스트
+    Test that reaching max_batch flushes before the interval elapses
+    """
+    flushed = asyncio.Event()
+
+    async def flush(statuses):
+        flushed.set()
+
+    batcher = StorageStatusBatcher(flush, flush_interval=10, max_batch=3)
+    task = asyncio.create_task(batcher.run())
+    for storage_id in 'abc':
+        batcher.put(storage_id, True)
+
+    await asyncio.wait_for(flushed.wait(), timeout=1)
+    batcher.stop()
+    await task
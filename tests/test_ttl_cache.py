@@ -0,0 +1,63 @@
+import time
+
+from src.supa_db.async_supa_db import AsyncSupaDB
+from src.supa_db.ttl_cache import TTLCache
+
+
+def test_lru_eviction():
+    """
+    최대 크기 초과 시 가장 오래 사용되지 않은 항목이 제거되는지 테스트
+    Test that the least recently used entry is evicted at maxsize
+    """
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is TTLCache.MISSING
+    assert cache.get('a') == 1
+    assert len(cache) == 2
+
+
+def test_expiry():
+    """
+    TTL 경과 후 항목이 만료되는지 테스트
+    Test that entries expire after the ttl
+    """
+    cache = TTLCache(ttl=0.01)
+    cache.set('a', None)
+    assert cache.get('a') is None
+    time.sleep(0.02)
+    assert cache.get('a') is TTLCache.MISSING
+
+
+async def test_privileged_request_served_from_cache():
+    """
+    캐시된 관리자 요청이 DB 조회 없이 처리되는지 테스트
+    Test that a privileged request with cached role and storage needs no query
+    """
+    supa_db = AsyncSupaDB(client=None)
+    supa_db.role_cache.set('u1', 'manager')
+    supa_db.storage_number_cache.set('s1', 7)
+
+    context = await supa_db.get_open_request_context('r1', 's1', 'u1')
+    assert context == {'number': 7, 'laundry_id': None, 'paid': None, 'role': 'manager'}
+
+
+def test_realtime_events_update_and_invalidate():
+    """
+    실시간 UPDATE/DELETE 이벤트로 캐시가 갱신/무효화되는지 테스트
+    Test that realtime UPDATE and DELETE events refresh and invalidate the caches
+    """
+    supa_db = AsyncSupaDB(client=None)
+    supa_db.role_cache.set('u1', 'user')
+    supa_db.storage_number_cache.set('s1', 7)
+
+    supa_db.handle_cache_event({'data': {'table': 'profiles', 'type': 'UPDATE',
+                                         'record': {'id': 'u1', 'role': 'manager'}}})
+    supa_db.handle_cache_event({'data': {'table': 'storages', 'type': 'DELETE',
+                                         'record': {}, 'old_record': {'id': 's1'}}})
+
+    assert supa_db.role_cache.get('u1') == 'manager'
+    assert supa_db.storage_number_cache.get('s1') is TTLCache.MISSING